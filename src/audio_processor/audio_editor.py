@@ -1,18 +1,131 @@
 from pydub import AudioSegment
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import tempfile
+import mp3_frames
 
-def extract_segment(audio_path: str, start_sec: float, end_sec: float, type: str) -> str:
-    """Extracts a segment and returns a temporary audio file path."""
-    audio = AudioSegment.from_file(audio_path)
+# Sample rate expected by both pyannote and resemblyzer
+MODEL_SAMPLE_RATE = 16000
+
+class DecodedAudio:
+    """
+    An audio file decoded once and shared by diarization, embedding and
+    segment export, so no stage has to decode the file again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.audio = AudioSegment.from_file(path)
+        self._samples = None
+
+    @property
+    def duration_sec(self) -> float:
+        return len(self.audio) / 1000
+
+    def samples(self) -> np.ndarray:
+        """Mono float32 samples in [-1, 1] at MODEL_SAMPLE_RATE."""
+        if self._samples is None:
+            mono = self.audio.set_channels(1).set_frame_rate(MODEL_SAMPLE_RATE)
+            samples = np.array(mono.get_array_of_samples(), dtype=np.float32)
+            samples /= float(1 << (8 * mono.sample_width - 1))
+            self._samples = samples
+        return self._samples
+
+    def slice_samples(self, start_sec: float, end_sec: float) -> np.ndarray:
+        """Model-rate samples between start_sec and end_sec."""
+        return self.samples()[int(start_sec * MODEL_SAMPLE_RATE):int(end_sec * MODEL_SAMPLE_RATE)]
+
+def _as_audio_segment(audio) -> AudioSegment:
+    if isinstance(audio, DecodedAudio):
+        return audio.audio
+    return AudioSegment.from_file(audio)
+
+def _source_path(audio) -> str:
+    return audio.path if isinstance(audio, DecodedAudio) else audio
+
+def _can_stream_copy(audio, type: str, exact: bool) -> bool:
+    return not exact and type == "mp3" and _source_path(audio).lower().endswith(".mp3")
+
+def _copy_clips(audio, ranges: list[tuple[float, float]]) -> list[str]:
+    """Cut MP3 clips by copying frames from the source file; no decode or re-encode."""
+    with open(_source_path(audio), "rb") as f:
+        data = f.read()
+    frames = mp3_frames.read_frames(data)
+    paths = []
+    for start_sec, end_sec in ranges:
+        # Only reserve the name; write_clip reopens the path
+        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp_audio:
+            pass
+        paths.append(mp3_frames.write_clip(data, frames, start_sec, end_sec, tmp_audio.name))
+    return paths
+
+def extract_segment(audio_path, start_sec: float, end_sec: float, type: str, exact: bool = False) -> str:
+    """
+    Extracts a segment and returns a temporary audio file path.
+    audio_path may be a file path or an already decoded DecodedAudio.
+    MP3 clips from MP3 sources are frame-copied (snapped to ~26ms frame
+    boundaries) unless exact=True asks for a sample-exact re-encode.
+    """
     if start_sec != None and end_sec != None:
+        if _can_stream_copy(audio_path, type, exact):
+            try:
+                return _copy_clips(audio_path, [(start_sec, end_sec)])[0]
+            except mp3_frames.Mp3FormatError as e:
+                print(f"Stream copy not possible, re-encoding: {e}")
+        audio = _as_audio_segment(audio_path)
         segment = audio[start_sec * 1000:end_sec * 1000]  # milliseconds
-        tmp_audio = tempfile.NamedTemporaryFile(suffix=f".{type}", delete=False)
+        with tempfile.NamedTemporaryFile(suffix=f".{type}", delete=False) as tmp_audio:
+            pass
         segment.export(tmp_audio.name, format=f"{type}")
         return tmp_audio.name
-    return audio_path
+    return _source_path(audio_path)
+
+def _export_clip(raw_data: bytes, sample_width: int, frame_rate: int, channels: int, type: str) -> str:
+    """Encode raw PCM to a temporary file. Runs in a worker process."""
+    segment = AudioSegment(data=raw_data, sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+    with tempfile.NamedTemporaryFile(suffix=f".{type}", delete=False) as tmp_audio:
+        pass
+    segment.export(tmp_audio.name, format=f"{type}")
+    return tmp_audio.name
+
+def extract_segments(audio_path, ranges: list[tuple[float, float]], type: str, workers: int = None, exact: bool = False,
+                     executor: ProcessPoolExecutor = None) -> list[str]:
+    """
+    Extracts many segments from one decode and returns their temporary file paths,
+    in the same order as ranges.
+    Args:
+        audio_path: File path or DecodedAudio.
+        ranges: (start_sec, end_sec) pairs.
+        type: Output format, e.g. "mp3".
+        workers: If > 1, encode clips in a process pool of this size.
+        exact: Re-encode for sample-exact cuts instead of frame-copying MP3s.
+        executor: Long-lived process pool to encode in, instead of starting one per call.
+    """
+    if _can_stream_copy(audio_path, type, exact):
+        try:
+            return _copy_clips(audio_path, ranges)
+        except mp3_frames.Mp3FormatError as e:
+            print(f"Stream copy not possible, re-encoding: {e}")
+
+    audio = _as_audio_segment(audio_path)
+    clips = [audio[start_sec * 1000:end_sec * 1000] for start_sec, end_sec in ranges]
+    if executor is not None and len(clips) > 1:
+        return _export_clips(executor, clips, type)
+    if not workers or workers <= 1 or len(clips) <= 1:
+        return [_export_clip(clip.raw_data, clip.sample_width, clip.frame_rate, clip.channels, type) for clip in clips]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return _export_clips(executor, clips, type)
+
+def _export_clips(executor: ProcessPoolExecutor, clips: list[AudioSegment], type: str) -> list[str]:
+    futures = [
+        executor.submit(_export_clip, clip.raw_data, clip.sample_width, clip.frame_rate, clip.channels, type)
+        for clip in clips
+    ]
+    return [future.result() for future in futures]
 
 def convert_type(path: str, to_type: str) -> str:
     audio = AudioSegment.from_file(path)
     audio_path = path.rsplit(".", 1)[0] + f".{to_type}"
     audio.export(audio_path, format=f"{to_type}")
-    return audio_path
\ No newline at end of file
+    return audio_path
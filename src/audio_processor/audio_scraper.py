@@ -1,8 +1,16 @@
 from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from playwright.async_api import async_playwright
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from lxml import etree
+import lxml.html
 import argparse
-import re
+import asyncio
+import requests
 import json
+import os
+import threading
 #  soup.find('a', href=re.compile('.*ukrainian_cities.mp3'), class_='audio-module-listen').parent.parent['data-audio']
 # '{"uid":"nx-s1-5411751:nx-s1-5472563-1","available":true,"duration":216,"title":"Russia launches massive drone and missile assaults on Ukrainian cities","audioUrl":"https:\\/\\/ondemand.npr.org\\/anon.npr-mp3\\/npr\\/me\\/2025\\/05\\/20250526_me_russia_launches_massive_drone_and_missile_assaults_on_ukrainian_cities.mp3?size=3470360&d=216863&e=nx-s1-5411751&sc=siteplayer","storyUrl":"https:\\/\\/www.npr.org\\/2025\\/05\\/26\\/nx-s1-5411751\\/russia-launches-massive-drone-and-missile-assaults-on-ukrainian-cities","slug":"Europe","program":"Morning Edition","affiliation":"","song":"","artist":"","album":"","track":0,"type":"segment","subtype":"other","skipSponsorship":false,"hasAdsWizz":false,"isStreamAudioType":false}'
 # >>> import json
@@ -14,67 +22,291 @@ import json
 # 'Russia launches massive drone and missile assaults on Ukrainian cities'
 
 
-def _get_soup(url: str) -> BeautifulSoup:
+def _get_html(url: str) -> str:
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
         page = browser.new_page()
-        # Example: Navigate to a page (replace with actual URL)
         page.goto(url)
         html = page.content()
-        soup = BeautifulSoup(html, "lxml")
-        # Example: Print the page title
-        # print(soup.title.string if soup.title else "No title found.")
         browser.close()
-        return soup
+        return html
+
+# Create a map of month names with the key of number and value of month name
+month_map = {
+    '01': 'january',
+    '02': 'february',
+    '03': 'march',
+    '04': 'april',
+    '05': 'may',
+    '06': 'june',
+    '07': 'july',
+    '08': 'august',
+    '09': 'september',
+    '10': 'october',
+    '11': 'november',
+    '12': 'december'
+}
+
+PROGRAMS = {
+    'morning-edition': 'Morning Edition',
+    'all-things-considered': 'All Things Considered',
+}
+
+def program_urls(date: str) -> dict[str, str]:
+    """Rundown page URL per program for a YYYY-MM-DD date."""
+    date_path = date.replace('-', '/')
+    date_with_month = f'{month_map[date[5:7]]}-{date[8:10]}-{date[:4]}'
+    return {
+        program: f'https://www.npr.org/programs/{program}/{date_path}/{program}-for-{date_with_month}'
+        for program in PROGRAMS
+    }
+
+# Rundown pages kept for conditional requests; least recently used are dropped
+HTTP_CACHE_ENTRIES = int(os.getenv("HTTP_CACHE_ENTRIES", 256))
+
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+class HttpFetcher:
+    """
+    Plain-HTTP page fetcher with a pooled keep-alive session. Remembers
+    ETag/Last-Modified per URL and sends conditional requests, reusing the
+    cached body on 304 Not Modified. At most cache_entries bodies are kept.
+    """
+
+    def __init__(self, pool_size: int = 10, timeout: float = 30, cache_entries: int = HTTP_CACHE_ENTRIES):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(HTTP_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.cache_entries = cache_entries
+        self._cache = OrderedDict()  # url -> (etag, last_modified, html), least recently used first
+        self._cache_lock = threading.Lock()
+
+    def get_html(self, url: str) -> str:
+        headers = {}
+        with self._cache_lock:
+            cached = self._cache.get(url)
+            if cached:
+                self._cache.move_to_end(url)
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and cached:
+            return cached[2]
+        response.raise_for_status()
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if (etag or last_modified) and self.cache_entries > 0:
+            with self._cache_lock:
+                self._cache[url] = (etag, last_modified, response.text)
+                self._cache.move_to_end(url)
+                while len(self._cache) > self.cache_entries:
+                    self._cache.popitem(last=False)
+        return response.text
+
+_http_fetcher = None
+
+def get_http_fetcher() -> HttpFetcher:
+    global _http_fetcher
+    if _http_fetcher is None:
+        _http_fetcher = HttpFetcher()
+    return _http_fetcher
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# Compiled once; parse_stories runs them against every rundown page.
+# Rundown articles are present in the server-rendered HTML.
+_ARTICLES = etree.XPath(f"//article[{_has_class('rundown-segment')}]")
+_BYLINE_SPANS = etree.XPath(f"(.//p[{_has_class('byline-container--inline')}])[1]//span[@class='byline byline--inline']")
+_AUDIO_LINK = etree.XPath(f"(.//a[{_has_class('audio-module-listen')} and contains(@href, '.mp3')])[1]")
+_AUDIO_DATA = etree.XPath("ancestor-or-self::*[@data-audio][1]/@data-audio")
+_TITLE = etree.XPath(f"(.//h4[{_has_class('audio-module-title')}])[1]")
+
+def _parse_html(html: str):
+    return lxml.html.document_fromstring(html)
+
+def has_rundown(tree) -> bool:
+    return bool(_ARTICLES(tree))
+
+def _get_tree_http(url: str):
+    """Fetch and parse url without a browser. Returns None when the rundown markup is missing."""
+    try:
+        tree = _parse_html(get_http_fetcher().get_html(url))
+    except requests.RequestException as e:
+        print(f"HTTP fetch failed for {url}: {e}")
+        return None
+    if not has_rundown(tree):
+        return None
+    return tree
 
 def scrape_stories(url: str) -> list[dict]:
-    soup = _get_soup(url)
+    tree = _get_tree_http(url)
+    if tree is None:
+        print(f"Rundown markup not found over HTTP, falling back to browser: {url}")
+        tree = _parse_html(_get_html(url))
+    return parse_stories(tree)
 
-    # Find correspondents
-    # Morning edition
+def _audio_metadata(link) -> dict:
+    """uid, duration, program, title and story url from the player's data-audio JSON."""
+    data_audio = _AUDIO_DATA(link)
+    if not data_audio:
+        return {}
+    audio_data = json.loads(data_audio[0])
+    return {
+        'uid': audio_data.get('uid'),
+        'title': audio_data.get('title'),
+        'duration_sec': audio_data.get('duration'),
+        'program': audio_data.get('program'),
+        'story_url': audio_data.get('storyUrl'),
+        'source_audio_url': audio_data.get('audioUrl'),
+    }
+
+def parse_stories(page) -> list[dict]:
+    """
+    Extract stories with byline correspondents from a rundown page.
+    page is the page HTML or an already parsed lxml tree.
+    """
+    tree = _parse_html(page) if isinstance(page, str) else page
     stories = list()
-    articles = soup.find_all('article', class_='rundown-segment')
-    for article in articles:
+    for article in _ARTICLES(tree):
         try:
-            byline_p = article.find('p', class_='byline-container--inline')
-            if byline_p:
-                spans = byline_p.find_all('span', class_='byline byline--inline')
-                correspondent_names = [span.get_text(strip=True) for span in spans]
-                if len(spans) == 1 and spans[0].get_text(strip=True) != 'Hosts':
-                    # Do something with articles that have exactly one byline span
-                    correspondent_name = spans[0].get_text(strip=True)
-                    audio_url = article.find('a', class_='audio-module-listen', href=re.compile('.*.mp3')).get("href").split('?', 1)[0]
-                    stories.append({
-                        'correspondent_name': correspondent_name,
-                        'audio_url': audio_url
-                    })
-                elif len(spans) > 1:
-                    # Multiple correspondents
-                    audio_url = article.find('a', class_='audio-module-listen', href=re.compile('.*.mp3')).get("href").split('?', 1)[0]
-                    stories.append({
-                        'correspondents': correspondent_names,
-                        'audio_url': audio_url
-                    })
+            spans = _BYLINE_SPANS(article)
+            if not spans:
+                continue
+            correspondent_names = [span.text_content().strip() for span in spans]
+            if len(spans) == 1 and correspondent_names[0] == 'Hosts':
+                continue
+
+            link = _AUDIO_LINK(article)[0]
+            story = {'audio_url': link.get("href").split('?', 1)[0]}
+            if len(spans) == 1:
+                story['correspondent_name'] = correspondent_names[0]
+            else:
+                # Multiple correspondents
+                story['correspondents'] = correspondent_names
+            story.update(_audio_metadata(link))
+            stories.append(story)
         except Exception as e:
-            article_title = article.find('h4', class_="audio-module-title").get_text(strip=True)
+            title = _TITLE(article)
+            article_title = title[0].text_content().strip() if title else "<untitled>"
             print(f"Error processing article titled: {article_title}, Error: {e}")
             continue
     return stories
 
-    # Find audio url
-    # soup.find('article', class_='rundown-segment').find('a', class_='audio-module-listen', href=re.compile('.*.mp3')).get("href")
+# Resources the rundown parser never looks at
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+BLOCKED_HOSTS = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googletagmanager.com",
+    "google-analytics.com",
+    "amazon-adsystem.com",
+    "adswizz.com",
+    "scorecardresearch.com",
+    "chartbeat.com",
+)
+
+class ScraperSession:
+    """
+    Keeps one headless Chromium and a pool of pages alive across many URLs.
+
+        async with ScraperSession(concurrency=4) as session:
+            results = await session.scrape_many(urls)
+    """
+
+    def __init__(self, concurrency: int = 4):
+        self.concurrency = concurrency
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._pages = None
+
+    async def __aenter__(self):
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        self._context = await self._browser.new_context()
+        await self._context.route("**/*", _block_unneeded_requests)
+        self._pages = asyncio.Queue()
+        for _ in range(self.concurrency):
+            self._pages.put_nowait(await self._context.new_page())
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._context.close()
+        await self._browser.close()
+        await self._playwright.stop()
+
+    async def get_html(self, url: str) -> str:
+        page = await self._pages.get()
+        try:
+            await page.goto(url, wait_until="domcontentloaded")
+            return await page.content()
+        finally:
+            self._pages.put_nowait(page)
+
+    async def scrape(self, url: str) -> list[dict]:
+        html = await self.get_html(url)
+        return parse_stories(html)
+
+    async def scrape_many(self, urls: list[str]) -> dict[str, list[dict]]:
+        """Scrape urls with at most `concurrency` pages in flight. Failed URLs map to []."""
+        async def scrape_one(url):
+            try:
+                return await self.scrape(url)
+            except Exception as e:
+                print(f"Error scraping {url}: {e}")
+                return []
+        results = await asyncio.gather(*(scrape_one(url) for url in urls))
+        return dict(zip(urls, results))
+
+async def _block_unneeded_requests(route):
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(host in request.url for host in BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+def scrape_many(urls: list[str], concurrency: int = 4) -> dict[str, list[dict]]:
+    """
+    Scrape urls over plain HTTP, then render only the pages whose rundown
+    markup was missing in one shared browser session.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        trees = dict(zip(urls, executor.map(_get_tree_http, urls)))
+    results = {url: parse_stories(tree) for url, tree in trees.items() if tree is not None}
 
-# each day
-# run script to pull all audio segments with correspondents
+    browser_urls = [url for url, tree in trees.items() if tree is None]
+    if browser_urls:
+        print(f"Rundown markup not found over HTTP for {len(browser_urls)} page(s), falling back to browser")
+        async def run():
+            async with ScraperSession(concurrency) as session:
+                return await session.scrape_many(browser_urls)
+        results.update(asyncio.run(run()))
+    return {url: results[url] for url in urls}
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--url", type=str, help="URL")
+    parser.add_argument("--url", type=str, nargs="+", help="URL(s)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pages to keep open at once")
     args = parser.parse_args()
     
+    stories = []
     if args.url:
-        stories = scrape_stories(args.url)
+        for url_stories in scrape_many(args.url, args.concurrency).values():
+            stories.extend(url_stories)
 
     for story in stories:
         print(json.dumps(story, ensure_ascii=False))
-    
\ No newline at end of file
@@ -6,7 +6,7 @@ DEFAULT_AUDIO_TYPE = "mp3"
 GCS_BUCKET_NAME = os.getenv("GCS_AUDIO_BUCKET_NAME", "npr_audio_quiz")
 
 def get_segment(correspondent_id: int, audio_id: int, segment_id: int):
-    audio_path = f"/{correspondent_id}/{audio_id}/{segment_id}.{DEFAULT_AUDIO_TYPE}"
+    audio_path = f"{correspondent_id}/{audio_id}/{segment_id}.{DEFAULT_AUDIO_TYPE}"
     return storage_service.get(GCS_BUCKET_NAME, audio_path)
 
 def save_segment(audio_metadata, segment):
@@ -18,6 +18,22 @@ def save_segment(audio_metadata, segment):
     storage_url, public_url = storage_service.save(segment_obj["mp3_audio_path"], GCS_BUCKET_NAME, f"{bucket__base_path}/{segment_id}.{DEFAULT_AUDIO_TYPE}")
     return storage_url, public_url
        
-def save_segments(audio_metadata, segments):
-    for seg in segments:
-        save_segment(audio_metadata, seg)
+def save_segments(audio_metadata, segments) -> list[tuple]:
+    """
+    Upload (segment, segment_id) clips concurrently.
+    Returns (segment_id, storage_url, public_url) per segment, in order.
+    """
+    correspondent_id = audio_metadata[0]
+    audio_id = audio_metadata[1]
+    segments = list(segments)
+    files = [
+        (segment_obj["mp3_audio_path"], f"{correspondent_id}/{audio_id}/{segment_id}.{DEFAULT_AUDIO_TYPE}")
+        for segment_obj, segment_id in segments
+    ]
+    urls = storage_service.save_many(files, GCS_BUCKET_NAME)
+    return [(segment_id, *url) for (_, segment_id), url in zip(segments, urls)]
+
+def delete_segments(audio_metadata, segment_ids) -> dict:
+    """Delete uploaded clips, e.g. when the transaction recording them rolls back."""
+    blob_names = [f"{audio_metadata[0]}/{audio_metadata[1]}/{segment_id}.{DEFAULT_AUDIO_TYPE}" for segment_id in segment_ids]
+    return storage_service.delete_many(GCS_BUCKET_NAME, blob_names)
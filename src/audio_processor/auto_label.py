@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+import numpy as np
+import json
+import os
+
+REVIEW_QUEUE_PATH = os.getenv("REVIEW_QUEUE_PATH", "review_queue.jsonl")
+
+# A speaker's centroid must be at least this similar to a byline
+# correspondent's stored voice to be labelled as them
+MATCH_THRESHOLD = 0.80
+# Any known voice this similar is treated as "already known" (e.g. a host)
+KNOWN_VOICE_THRESHOLD = 0.75
+# For a new correspondent, the chosen unknown speaker must account for at
+# least this share of the story's unknown-speaker audio
+MIN_NEW_SPEAKER_SHARE = 0.5
+
+
+def _normalize_name(name: str) -> str:
+    return " ".join(name.lower().split())
+
+def _decision(speaker_id=None, correspondent_name=None, gender='U', confidence=0.0, confident=False, reason=""):
+    return {
+        "speaker_id": speaker_id,
+        "correspondent_name": correspondent_name,
+        "gender": gender,
+        "confidence": round(float(confidence), 3),
+        "confident": confident,
+        "reason": reason,
+    }
+
+def label_story(story: dict, speakers: dict[str, dict], index) -> dict:
+    """
+    Choose the byline correspondent's speaker without prompting.
+
+    1. If a speaker's voice matches a byline name already in the index, label
+       that speaker as them (confidence = similarity).
+    2. Otherwise, for a single byline name not yet in the index, label the
+       dominant speaker that matches no known voice as a new correspondent
+       (confidence = that speaker's share of unknown-speaker audio).
+    Anything else is returned with confident=False for human review.
+    """
+    names = story.get('correspondents') or [story.get('correspondent_name')]
+    names = [name for name in names if name]
+    if not speakers or not names:
+        return _decision(reason="no embeddable speakers or byline names")
+
+    byline = {_normalize_name(name): name for name in names}
+    speaker_ids = list(speakers)
+    matches = index.search(np.stack([speakers[s]['centroid'] for s in speaker_ids]), k=5)
+
+    best = None
+    unknown_speakers = []
+    for speaker_id, speaker_matches in zip(speaker_ids, matches):
+        for _, fullname, gender, similarity in speaker_matches:
+            if _normalize_name(fullname) in byline and similarity >= MATCH_THRESHOLD:
+                if best is None or similarity > best[0]:
+                    best = (similarity, speaker_id, fullname, gender)
+        if not speaker_matches or speaker_matches[0][3] < KNOWN_VOICE_THRESHOLD:
+            unknown_speakers.append(speaker_id)
+
+    if best:
+        similarity, speaker_id, fullname, gender = best
+        return _decision(speaker_id, fullname, gender or 'U', similarity, True, "voice matches byline correspondent")
+
+    if len(names) > 1:
+        return _decision(reason="multiple byline names and no voice match")
+    if _index_has_name(index, names[0]):
+        return _decision(correspondent_name=names[0], reason="byline correspondent is known but no speaker matches their voice")
+    if not unknown_speakers:
+        return _decision(correspondent_name=names[0], reason="every speaker matches an existing correspondent")
+
+    durations = {speaker_id: speakers[speaker_id]['duration_sec'] for speaker_id in unknown_speakers}
+    speaker_id = max(durations, key=durations.get)
+    share = durations[speaker_id] / sum(durations.values())
+    return _decision(
+        speaker_id, names[0], 'U', share, share >= MIN_NEW_SPEAKER_SHARE,
+        f"dominant unknown speaker for new correspondent ({share:.0%} of unknown-speaker audio)"
+    )
+
+def _index_has_name(index, name: str) -> bool:
+    target = _normalize_name(name)
+    return any(_normalize_name(fullname) == target for fullname in index.fullnames)
+
+def queue_for_review(story: dict, segments: list[dict], speakers: dict[str, dict], decision: dict,
+                     path: str = REVIEW_QUEUE_PATH):
+    """Append a low-confidence story, its segments and the auto-label decision to the review queue (JSON lines)."""
+    entry = {
+        "queued_at": datetime.now(timezone.utc).isoformat(),
+        "story": story,
+        "decision": decision,
+        "speakers": {
+            speaker_id: {key: value for key, value in speaker.items() if key != 'centroid'}
+            for speaker_id, speaker in speakers.items()
+        },
+        "segments": [{key: value for key, value in seg.items() if key != 'embedding'} for seg in segments],
+    }
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    print(f"Queued for review ({decision['reason']}): {story['audio_url']}")
@@ -1,14 +1,11 @@
-import os
-import psycopg2
 from diarize_audio import download_audio
-from audio_editor import extract_segment
-from correspondents_datasource import update_audio_segment_storage_url, db_pool
-from main import save_segments, cleanup_audio
+from audio_editor import extract_segments
+from audio_storage import save_segments
+from correspondents_datasource import db_pool, update_audio_segment_urls
+from main import cleanup_audio, CLIP_WORKERS
 
 def get_missing_url_records():
-    # Connect to DB
-    db_url = os.getenv("CORRESPONDENTS_DB_CONN_URL")
-    conn = db_pool.getconn()
+    conn = db_pool.getconn("backfill")
     cursor = conn.cursor()
 
     try:
@@ -37,30 +34,35 @@ def get_missing_url_records():
         cursor.close()
         db_pool.putconn(conn)
 
+def group_records_by_audio(records):
+    """Group (audio_id, correspondent_id, url, seg_id, start, end) rows by audio so each file is decoded once."""
+    grouped = {}
+    for record in records:
+        audio_id, correspondent_id, audio_url = record[0], record[1], record[2]
+        grouped.setdefault((audio_id, correspondent_id, audio_url), []).append(record)
+    return grouped
+
 def main():
-    db_url = os.getenv("CORRESPONDENTS_DB_CONN_URL")
-    records = get_missing_url_records()
+    records = get_missing_url_records() or []
 
-    for record in records:
-        print(f"starting: {record}")
-        audio_id = record[0]
-        correspondent_id = record[1]
-        audio_url = record[2]
-        segment_id = record[3]
-        start_time_sec = record[4]
-        end_time_sec = record[5]
-        audio_filename = os.path.basename(audio_url)
-        mp3_audio_path = os.path.join("downloads", audio_filename) #downloads/filename.mp3
+    for (audio_id, correspondent_id, audio_url), audio_records in group_records_by_audio(records).items():
+        print(f"starting: audio {audio_id} ({len(audio_records)} segment(s))")
+        segment_paths = []
 
         try:
-            if not os.path.exists(mp3_audio_path):
-                mp3_audio_path = download_audio(audio_url)
+            mp3_audio_path = download_audio(audio_url)
 
-            segment_path = extract_segment(mp3_audio_path,  start_time_sec, end_time_sec, "mp3")
-            save_segments(db_url, (correspondent_id, audio_id), [({"mp3_audio_path": segment_path}, segment_id)])
+            ranges = [(record[4], record[5]) for record in audio_records]
+            segment_paths = extract_segments(mp3_audio_path, ranges, "mp3", workers=CLIP_WORKERS)
+            segments = [({"mp3_audio_path": path}, record[3]) for path, record in zip(segment_paths, audio_records)]
+            urls = save_segments((correspondent_id, audio_id), segments)
+            updated = update_audio_segment_urls(audio_id, urls)
+            print(f"Recorded urls for {updated} segment(s) of audio {audio_id}")
+        except Exception as e:
+            print(f"❌ Error backfilling audio {audio_id}: {e}")
         finally:
-            pass
-            # cleanup_audio(segment_path)
+            for segment_path in segment_paths:
+                cleanup_audio(segment_path)
 
 
 if __name__ == "__main__":
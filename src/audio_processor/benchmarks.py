@@ -0,0 +1,503 @@
+import argparse
+import json
+import os
+import time
+
+
+def timed(fn, *args, **kwargs):
+    """Run fn and return (result, elapsed seconds)."""
+    start_time = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start_time
+
+def _remove_files(paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+def bench_extract_segments(args):
+    """Per-segment extract_segment loop (old process_story/backfill path) vs. extract_segments."""
+    from pydub import AudioSegment
+    from audio_editor import extract_segment, extract_segments
+
+    duration_sec = len(AudioSegment.from_file(args.audio_path)) / 1000
+    step = duration_sec / args.segments
+    ranges = [(i * step, (i + 1) * step) for i in range(args.segments)]
+
+    loop_paths, loop_sec = timed(lambda: [extract_segment(args.audio_path, start, end, args.type, exact=True) for start, end in ranges])
+    _remove_files(loop_paths)
+    single_paths, single_sec = timed(extract_segments, args.audio_path, ranges, args.type, exact=True)
+    _remove_files(single_paths)
+    pool_paths, pool_sec = timed(extract_segments, args.audio_path, ranges, args.type, workers=args.workers, exact=True)
+    _remove_files(pool_paths)
+    copy_paths, copy_sec = timed(extract_segments, args.audio_path, ranges, args.type)
+    _remove_files(copy_paths)
+
+    return {
+        "audio_sec": duration_sec,
+        "segments": args.segments,
+        "per_segment_loop_sec": loop_sec,
+        "extract_segments_sec": single_sec,
+        f"extract_segments_{args.workers}_workers_sec": pool_sec,
+        "extract_segments_stream_copy_sec": copy_sec,
+    }
+
+def bench_scrape_fetch(args):
+    """Plain-HTTP fetch + parse vs. Playwright render + parse for the same rundown pages."""
+    import audio_scraper
+
+    results = []
+    for url in args.urls:
+        http_stories, http_sec = timed(lambda: audio_scraper.parse_stories(audio_scraper.get_http_fetcher().get_html(url)))
+        _, conditional_sec = timed(audio_scraper.get_http_fetcher().get_html, url)
+        browser_stories, browser_sec = timed(lambda: audio_scraper.parse_stories(audio_scraper._get_html(url)))
+        results.append({
+            "url": url,
+            "http_sec": http_sec,
+            "http_conditional_sec": conditional_sec,
+            "browser_sec": browser_sec,
+            "http_stories": len(http_stories),
+            "browser_stories": len(browser_stories),
+        })
+    return results
+
+def _parse_stories_bs4(html: str) -> list[dict]:
+    """The original BeautifulSoup find/find_all parser, kept as the parse benchmark baseline."""
+    from bs4 import BeautifulSoup
+    import re
+
+    soup = BeautifulSoup(html, "lxml")
+    stories = []
+    for article in soup.find_all('article', class_='rundown-segment'):
+        byline_p = article.find('p', class_='byline-container--inline')
+        if not byline_p:
+            continue
+        spans = byline_p.find_all('span', class_='byline byline--inline')
+        names = [span.get_text(strip=True) for span in spans]
+        if (len(spans) == 1 and names[0] != 'Hosts') or len(spans) > 1:
+            link = article.find('a', class_='audio-module-listen', href=re.compile('.*.mp3'))
+            stories.append({'correspondents': names, 'audio_url': link.get("href").split('?', 1)[0]})
+    return stories
+
+def bench_parse(args):
+    """BeautifulSoup baseline vs. compiled lxml/XPath extractor over saved rundown HTML files."""
+    import audio_scraper
+
+    pages = []
+    for path in args.html_files:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+
+    _, bs4_sec = timed(lambda: [_parse_stories_bs4(html) for _ in range(args.repeat) for html in pages])
+    stories, lxml_sec = timed(lambda: [audio_scraper.parse_stories(html) for _ in range(args.repeat) for html in pages])
+    parses = args.repeat * len(pages)
+    return {
+        "pages": len(pages),
+        "parses": parses,
+        "stories_per_parse_pass": sum(len(page_stories) for page_stories in stories[:len(pages)]),
+        "bs4_ms_per_page": bs4_sec * 1000 / parses,
+        "lxml_ms_per_page": lxml_sec * 1000 / parses,
+    }
+
+# The pre-index similarity query: scores every row, then filters
+LEGACY_SIMILARITY_SQL = """
+    select id, fullname, gender, similarity from
+    (select id, fullname, gender, 1 - (embedding <=> %(embedding)s::vector) AS similarity from correspondents)
+    where similarity > %(min_threshold)s
+    ORDER BY similarity DESC
+"""
+
+def _bench_connection(schema: str, connection_factory=None):
+    """A connection whose unqualified table names resolve to a scratch schema first."""
+    import psycopg2
+
+    conn = psycopg2.connect(os.environ["CORRESPONDENTS_DB_CONN_URL"], options=f"-c search_path={schema},public",
+                            connection_factory=connection_factory)
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+    conn.commit()
+    return conn
+
+def _average_query_ms(cursor, sql: str, params: list[dict]) -> tuple[float, list]:
+    results = []
+    start_time = time.perf_counter()
+    for query_params in params:
+        cursor.execute(sql, query_params)
+        results.append([row[0] for row in cursor.fetchall()])
+    return (time.perf_counter() - start_time) * 1000 / len(params), results
+
+def bench_similarity(args):
+    """Legacy full-scan similarity vs. ORDER BY distance LIMIT k, exact and via HNSW, on synthetic voices."""
+    import numpy as np
+    from correspondents_datasource import TOP_K_SIMILARITY_SQL
+
+    # The datasource runs it as a prepared statement; bind the same parameters by name here
+    top_k_sql = TOP_K_SIMILARITY_SQL.replace("$1", "%(embedding)s").replace("$2", "%(k)s").replace("$3", "%(min_threshold)s")
+    schema = "bench_similarity"
+    conn = _bench_connection(schema)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS correspondents (
+                id SERIAL PRIMARY KEY, fullname VARCHAR NOT NULL, gender VARCHAR, embedding vector(256) NOT NULL
+            )
+        """)
+        cursor.execute("SELECT count(*) FROM correspondents")
+        if cursor.fetchone()[0] != args.rows:
+            print(f"Seeding {args.rows} synthetic voices...")
+            cursor.execute("TRUNCATE correspondents")
+            cursor.execute("DROP INDEX IF EXISTS correspondents_embedding_hnsw_idx")
+            cursor.execute("""
+                INSERT INTO correspondents (fullname, gender, embedding)
+                SELECT 'voice ' || i, (ARRAY['M', 'F', 'U'])[1 + i % 3],
+                       (SELECT array_agg(random() - 0.5)::vector FROM generate_series(1, 256) WHERE i > 0)
+                FROM generate_series(1, %s) i
+            """, (args.rows,))
+        conn.commit()
+
+        rng = np.random.default_rng(0)
+        params = [
+            {"embedding": (rng.random(256) - 0.5).tolist(), "k": args.k, "min_threshold": args.threshold}
+            for _ in range(args.queries)
+        ]
+
+        legacy_ms, _ = _average_query_ms(cursor, LEGACY_SIMILARITY_SQL, params)
+        cursor.execute("DROP INDEX IF EXISTS correspondents_embedding_hnsw_idx")
+        exact_ms, exact = _average_query_ms(cursor, top_k_sql, params)
+
+        _, index_build_sec = timed(cursor.execute, """
+            CREATE INDEX correspondents_embedding_hnsw_idx ON correspondents
+            USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+        """)
+        conn.commit()
+        cursor.execute("SELECT set_config('hnsw.ef_search', %s, false)", (str(max(40, args.k)),))
+        hnsw_ms, approximate = _average_query_ms(cursor, top_k_sql, params)
+
+        hits = sum(len(set(a) & set(e)) for a, e in zip(approximate, exact))
+        total = sum(len(e) for e in exact)
+        return {
+            "rows": args.rows,
+            "k": args.k,
+            "threshold": args.threshold,
+            "legacy_full_scan_ms": legacy_ms,
+            "top_k_exact_ms": exact_ms,
+            "top_k_hnsw_ms": hnsw_ms,
+            "hnsw_build_sec": index_build_sec,
+            "hnsw_recall": hits / total if total else None,
+        }
+    finally:
+        cursor.close()
+        if not args.keep:
+            with conn.cursor() as drop_cursor:
+                drop_cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+            conn.commit()
+        conn.close()
+
+def _counting_connection_factory(counter: dict):
+    """A connection class that counts round-trips: statements (execute_values pages included), commits and rollbacks."""
+    from psycopg2.extensions import connection, cursor
+
+    class CountingCursor(cursor):
+        def execute(self, query, vars=None):
+            counter["round_trips"] += 1
+            return super().execute(query, vars)
+
+    class CountingConnection(connection):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.cursor_factory = CountingCursor
+
+        def commit(self):
+            counter["round_trips"] += 1
+            return super().commit()
+
+        def rollback(self):
+            counter["round_trips"] += 1
+            return super().rollback()
+
+    return CountingConnection
+
+def _legacy_save_story(conn, fullname, embedding, url, segments, urls):
+    """The statements the old handle_db_operations + per-segment URL updates issued, one commit each."""
+    from psycopg2.extras import execute_values
+
+    cursor = conn.cursor()
+    cursor.execute("select id, fullname, gender from correspondents where fullname = %s", (fullname,))
+    row = cursor.fetchone()
+    conn.rollback()  # what the pool does when the read-only connection is returned
+    if row:
+        correspondent_id = row[0]
+    else:
+        cursor.execute("INSERT INTO correspondents (fullname, gender, embedding) VALUES (%s, %s, %s) RETURNING id", (fullname, "U", embedding))
+        correspondent_id = cursor.fetchone()[0]
+        conn.commit()
+    cursor.execute("INSERT INTO audio (correspondent_id, url) VALUES (%s, %s) RETURNING id", (correspondent_id, url))
+    audio_id = cursor.fetchone()[0]
+    conn.commit()
+    execute_values(cursor, """
+        INSERT INTO audio_segments (audio_id, start_time_sec, end_time_sec, duration_sec, segment_embedding)
+        VALUES %s RETURNING id
+    """, [(audio_id, seg['start_time_sec'], seg['end_time_sec'], seg['end_time_sec'] - seg['start_time_sec'], seg['embedding']) for seg in segments],
+        template="(%s, %s, %s, %s, %s::vector)")
+    segment_ids = [r[0] for r in cursor.fetchall()]
+    conn.commit()
+    for segment_id, (storage_url, public_url) in zip(segment_ids, urls):
+        cursor.execute("UPDATE audio_segments SET storage_url = %s WHERE audio_id = %s AND id = %s", (storage_url, audio_id, segment_id))
+        conn.commit()
+        cursor.execute("UPDATE audio_segments SET public_url = %s WHERE id = %s", (public_url, segment_id))
+        conn.commit()
+    cursor.close()
+
+def bench_persist(args):
+    """Round-trips and time per stored story: the old per-call commits vs. StoryUnitOfWork."""
+    import numpy as np
+    from correspondents_datasource import StoryUnitOfWork
+
+    schema = "bench_persist"
+    counter = {"round_trips": 0}
+    conn = _bench_connection(schema, _counting_connection_factory(counter))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS correspondents (
+                    id SERIAL PRIMARY KEY, fullname VARCHAR NOT NULL, gender VARCHAR, embedding vector(256) NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS audio (
+                    id SERIAL PRIMARY KEY, correspondent_id INT REFERENCES correspondents(id) ON DELETE CASCADE, url TEXT UNIQUE NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS audio_segments (
+                    id SERIAL PRIMARY KEY, audio_id INT REFERENCES audio(id) ON DELETE CASCADE,
+                    start_time_sec DECIMAL(10, 1) NOT NULL, end_time_sec DECIMAL(10, 1) NOT NULL, duration_sec DECIMAL(10, 1) NOT NULL,
+                    storage_url TEXT, public_url TEXT, segment_embedding vector(256)
+                );
+                TRUNCATE correspondents, audio, audio_segments;
+            """)
+        conn.commit()
+
+        rng = np.random.default_rng(0)
+        def story(variant, i):
+            segments = [
+                {"start_time_sec": 15.0 * n, "end_time_sec": 15.0 * n + 12.0, "embedding": rng.random(256).tolist()}
+                for n in range(args.segments)
+            ]
+            urls = [(f"gs://bench/{variant}/{i}/{n}.mp3", f"https://bench/{variant}/{i}/{n}.mp3") for n in range(args.segments)]
+            # Every other story is by a new correspondent
+            return f"{variant} correspondent {i // 2}", rng.random(256).tolist(), f"https://bench/{variant}/{i}.mp3", segments, urls
+
+        results = {"stories": args.stories, "segments_per_story": args.segments}
+        for variant in ("legacy", "unit_of_work"):
+            stories = [story(variant, i) for i in range(args.stories)]
+            counter["round_trips"] = 0
+            start_time = time.perf_counter()
+            for fullname, embedding, url, segments, urls in stories:
+                if variant == "legacy":
+                    _legacy_save_story(conn, fullname, embedding, url, segments, urls)
+                else:
+                    uow = StoryUnitOfWork(conn)
+                    _, audio_id, segment_ids = uow.save_story(fullname, "U", embedding, url, segments)
+                    uow.set_segment_urls(audio_id, [(segment_id, *pair) for segment_id, pair in zip(segment_ids, urls)])
+                    uow.cursor.close()
+                    conn.commit()
+            elapsed = time.perf_counter() - start_time
+            results[variant] = {
+                "round_trips_per_story": counter["round_trips"] / args.stories,
+                "ms_per_story": elapsed * 1000 / args.stories,
+            }
+        return results
+    finally:
+        conn.rollback()
+        if not args.keep:
+            with conn.cursor() as drop_cursor:
+                drop_cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+            conn.commit()
+        conn.close()
+
+def bench_storage(args):
+    """save_many/get_many throughput per storage backend for a batch of clip-sized files."""
+    import tempfile
+    import storage_service
+
+    paths = []
+    for _ in range(args.files):
+        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as f:
+            f.write(os.urandom(args.size))
+            paths.append(f.name)
+    files = [(path, f"bench/{i}.mp3") for i, path in enumerate(paths)]
+    blob_paths = [blob_path for _, blob_path in files]
+
+    results = {"files": args.files, "bytes_per_file": args.size}
+    try:
+        for name in args.backends:
+            backend = storage_service.BACKENDS[name]()
+            _, save_sec = timed(backend.save_many, files, args.bucket, args.workers)
+            _, get_sec = timed(backend.get_many, args.bucket, blob_paths, args.workers)
+            backend.delete_many(args.bucket, blob_paths, args.workers)
+            results[name] = {"save_many_sec": save_sec, "get_many_sec": get_sec, "files_per_sec": args.files / save_sec}
+    finally:
+        _remove_files(paths)
+    return results
+
+# get_quiz_metadata's query before the quiz sampling views: ORDER BY random() over
+# every correspondent, every segment of the picks, and a distractor sort per question
+LEGACY_QUIZ_SQL = """
+    with random_correspondents AS (
+        SELECT id AS correspondent_id FROM correspondents ORDER BY random() LIMIT %(questions)s
+    ),
+    random_segments AS (
+        SELECT DISTINCT ON (corr.id)
+            corr.id AS correct_correspondent_id, corr.fullname AS correct_correspondent_name,
+            corr.gender AS correct_correspondent_gender, asegs.public_url AS audio_url
+        FROM random_correspondents rc
+            JOIN correspondents corr ON corr.id = rc.correspondent_id
+            JOIN audio ON audio.correspondent_id = corr.id
+            JOIN audio_segments asegs ON audio.id = asegs.audio_id
+        ORDER BY corr.id, random()
+    ),
+    question_with_options AS (
+        SELECT rs.*, (
+            SELECT json_agg(json_build_object('id', id, 'fullname', fullname))
+            FROM (
+                SELECT id, fullname FROM (
+                    SELECT c.id, c.fullname FROM correspondents c
+                    WHERE c.id != rs.correct_correspondent_id AND c.gender = rs.correct_correspondent_gender
+                    ORDER BY random() LIMIT 3
+                ) distractors
+                UNION ALL
+                SELECT rs.correct_correspondent_id, rs.correct_correspondent_name
+            ) all_choices
+            ORDER BY random()
+        ) AS multiple_choice
+        FROM random_segments rs
+    )
+    SELECT json_agg(row_to_json(payload)) FROM (
+        select correct_correspondent_id correspondent_id, correct_correspondent_name correspondent_name,
+            audio_url, multiple_choice options
+        from question_with_options
+    ) payload
+"""
+
+def bench_quiz(args):
+    """Quiz generation latency: ORDER BY random() over the tables vs. sampling the quiz views."""
+    from correspondents_datasource import MIGRATIONS_DIR, QUIZ_SQL
+
+    schema = "bench_quiz"
+    conn = _bench_connection(schema)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS correspondents (
+                id SERIAL PRIMARY KEY, fullname VARCHAR NOT NULL, gender VARCHAR, embedding vector(256) NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS audio (
+                id SERIAL PRIMARY KEY, correspondent_id INT REFERENCES correspondents(id) ON DELETE CASCADE, url TEXT UNIQUE NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS audio_segments (
+                id SERIAL PRIMARY KEY, audio_id INT REFERENCES audio(id) ON DELETE CASCADE,
+                start_time_sec DECIMAL(10, 1) NOT NULL, end_time_sec DECIMAL(10, 1) NOT NULL, duration_sec DECIMAL(10, 1) NOT NULL,
+                storage_url TEXT, public_url TEXT, segment_embedding vector(256)
+            );
+        """)
+        cursor.execute("SELECT (SELECT count(*) FROM correspondents), (SELECT count(*) FROM audio_segments)")
+        if cursor.fetchone() != (args.correspondents, args.segments):
+            print(f"Seeding {args.correspondents} correspondents and {args.segments} segments...")
+            cursor.execute("TRUNCATE correspondents, audio, audio_segments RESTART IDENTITY")
+            cursor.execute("""
+                INSERT INTO correspondents (fullname, gender, embedding)
+                SELECT 'voice ' || i, (ARRAY['M', 'F', 'U'])[1 + i %% 3], array_fill(0.1, ARRAY[256])::vector
+                FROM generate_series(1, %(correspondents)s) i;
+                INSERT INTO audio (correspondent_id, url)
+                SELECT 1 + i %% %(correspondents)s, 'https://bench/story/' || i || '.mp3'
+                FROM generate_series(1, %(audio)s) i;
+                INSERT INTO audio_segments (audio_id, start_time_sec, end_time_sec, duration_sec, public_url)
+                SELECT 1 + i %% %(audio)s, 0, 12, 12, 'https://bench/clip/' || i || '.mp3'
+                FROM generate_series(1, %(segments)s) i;
+                ANALYZE;
+            """, {"correspondents": args.correspondents, "segments": args.segments,
+                  "audio": max(1, args.segments // args.segments_per_audio)})
+        cursor.execute("DROP MATERIALIZED VIEW IF EXISTS quiz_correspondents, quiz_genders")
+        conn.commit()
+
+        with open(os.path.join(MIGRATIONS_DIR, "004_quiz_sampling.sql")) as f:
+            _, build_sec = timed(cursor.execute, f.read())
+        conn.commit()
+        _, refresh_sec = timed(cursor.execute, "SELECT refresh_quiz_sampling()")
+        conn.commit()
+
+        params = [{"questions": args.questions}] * args.queries
+        legacy_ms, _ = _average_query_ms(cursor, LEGACY_QUIZ_SQL, params)
+        sampled_ms, _ = _average_query_ms(cursor, QUIZ_SQL, params)
+        cursor.execute(QUIZ_SQL, {"questions": args.questions})
+        quiz = cursor.fetchone()[0] or []
+        return {
+            "correspondents": args.correspondents,
+            "segments": args.segments,
+            "questions": args.questions,
+            "legacy_order_by_random_ms": legacy_ms,
+            "sampled_views_ms": sampled_ms,
+            "views_build_sec": build_sec,
+            "views_refresh_sec": refresh_sec,
+            "sample_questions": len(quiz),
+            "sample_options_per_question": [len(question["options"]) for question in quiz],
+        }
+    finally:
+        conn.rollback()
+        cursor.close()
+        if not args.keep:
+            with conn.cursor() as drop_cursor:
+                drop_cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+            conn.commit()
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the audio processing pipeline")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    extract_parser = subparsers.add_parser("extract-segments", help="Compare per-segment and multi-segment clip export")
+    extract_parser.add_argument("audio_path", help="Episode audio file, e.g. downloads/story.mp3")
+    extract_parser.add_argument("--segments", type=int, default=15, help="Number of evenly spaced clips")
+    extract_parser.add_argument("--type", default="mp3", help="Output format")
+    extract_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Process pool size")
+    extract_parser.set_defaults(run=bench_extract_segments)
+
+    fetch_parser = subparsers.add_parser("scrape-fetch", help="Compare plain-HTTP and browser fetching of rundown pages")
+    fetch_parser.add_argument("urls", nargs="+", help="Program rundown page URLs")
+    fetch_parser.set_defaults(run=bench_scrape_fetch)
+
+    parse_parser = subparsers.add_parser("parse", help="Compare BeautifulSoup and lxml rundown parsing")
+    parse_parser.add_argument("html_files", nargs="+", help="Saved rundown page HTML files")
+    parse_parser.add_argument("--repeat", type=int, default=20, help="Parses per file")
+    parse_parser.set_defaults(run=bench_parse)
+
+    similarity_parser = subparsers.add_parser("similarity", help="Compare similarity lookups on a synthetic correspondents table")
+    similarity_parser.add_argument("--rows", type=int, default=100_000, help="Synthetic voices to seed")
+    similarity_parser.add_argument("--queries", type=int, default=50, help="Lookups per variant")
+    similarity_parser.add_argument("--k", type=int, default=10, help="Neighbours per lookup")
+    similarity_parser.add_argument("--threshold", type=float, default=-1.0, help="Minimum similarity; -1 keeps every neighbour")
+    similarity_parser.add_argument("--keep", action="store_true", help="Keep the seeded bench_similarity schema for reruns")
+    similarity_parser.set_defaults(run=bench_similarity)
+
+    persist_parser = subparsers.add_parser("persist", help="Compare DB round-trips per stored story")
+    persist_parser.add_argument("--stories", type=int, default=50, help="Stories to store per variant")
+    persist_parser.add_argument("--segments", type=int, default=8, help="Segments per story")
+    persist_parser.add_argument("--keep", action="store_true", help="Keep the bench_persist schema")
+    persist_parser.set_defaults(run=bench_persist)
+
+    storage_parser = subparsers.add_parser("storage", help="Compare storage backends for clip uploads")
+    storage_parser.add_argument("--backends", nargs="+", default=["memory", "local"], help="Backends to compare (add gcs to include GCS)")
+    storage_parser.add_argument("--files", type=int, default=50, help="Files per batch")
+    storage_parser.add_argument("--size", type=int, default=200_000, help="Bytes per file")
+    storage_parser.add_argument("--bucket", default="bench-storage", help="Bucket to write to")
+    storage_parser.add_argument("--workers", type=int, default=8, help="Concurrent transfers")
+    storage_parser.set_defaults(run=bench_storage)
+
+    quiz_parser = subparsers.add_parser("quiz", help="Compare quiz generation queries on a synthetic roster")
+    quiz_parser.add_argument("--correspondents", type=int, default=10_000, help="Synthetic correspondents to seed")
+    quiz_parser.add_argument("--segments", type=int, default=1_000_000, help="Synthetic clips to seed")
+    quiz_parser.add_argument("--segments_per_audio", type=int, default=10, help="Clips per synthetic story")
+    quiz_parser.add_argument("--questions", type=int, default=10, help="Questions per quiz")
+    quiz_parser.add_argument("--queries", type=int, default=20, help="Quizzes per variant")
+    quiz_parser.add_argument("--keep", action="store_true", help="Keep the seeded bench_quiz schema for reruns")
+    quiz_parser.set_defaults(run=bench_quiz)
+
+    args = parser.parse_args()
+    print(json.dumps(args.run(args), indent=2))
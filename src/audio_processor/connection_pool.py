@@ -0,0 +1,221 @@
+from psycopg2 import pool
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+import json
+import os
+import psycopg2
+import re
+import threading
+import time
+import weakref
+
+DEFAULT_DSN_ENV = "CORRESPONDENTS_DB_CONN_URL"
+# Connections opened up front on first use; idle connections are kept up to maxconn
+DEFAULT_MIN_CONN = int(os.getenv("DB_POOL_MIN", 1))
+DEFAULT_MAX_CONN = int(os.getenv("DB_POOL_MAX", 10))
+# Connections older than this are closed when returned instead of reused
+DEFAULT_MAX_LIFETIME_SEC = float(os.getenv("DB_MAX_LIFETIME_SEC", 30 * 60))
+# Connections idle longer than this are checked with SELECT 1 before being handed out
+DEFAULT_VALIDATE_IDLE_SEC = float(os.getenv("DB_VALIDATE_IDLE_SEC", 30))
+DEFAULT_CHECKOUT_TIMEOUT_SEC = float(os.getenv("DB_CHECKOUT_TIMEOUT_SEC", 30))
+# Server-side prepared statements for hot queries; turn off behind a transaction-mode pgbouncer
+PREPARE_STATEMENTS = os.getenv("DB_PREPARE_STATEMENTS", "1") != "0"
+
+
+class ConnectionPool:
+    """
+    A thread-safe Postgres pool that connects on first use, not at import.
+
+    Checkouts block (up to checkout_timeout_sec) while every connection is
+    busy instead of failing. Connections idle for a while are validated
+    before reuse and closed once they exceed max_lifetime_sec. Returned
+    connections stay open for reuse, so a burst of maxconn workers does not
+    reconnect on every checkout. Checkout wait, how long each caller holds
+    its connection, and saturation are kept for get_metrics().
+    """
+
+    def __init__(self, dsn_env: str = DEFAULT_DSN_ENV, minconn: int = DEFAULT_MIN_CONN, maxconn: int = DEFAULT_MAX_CONN,
+                 max_lifetime_sec: float = DEFAULT_MAX_LIFETIME_SEC, validate_idle_sec: float = DEFAULT_VALIDATE_IDLE_SEC,
+                 checkout_timeout_sec: float = DEFAULT_CHECKOUT_TIMEOUT_SEC):
+        self.dsn_env = dsn_env
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_lifetime_sec = max_lifetime_sec
+        self.validate_idle_sec = validate_idle_sec
+        self.checkout_timeout_sec = checkout_timeout_sec
+        self._dsn = None
+        self._idle = []  # most recently returned last
+        self._generation = 0  # bumped by closeall; older connections are closed when returned
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        # conn -> {"created", "generation", "last_used", "prepared", "name", "checked_out"}; weak so that
+        # a connection dropped without putconn takes its metadata with it
+        self._connections = weakref.WeakKeyDictionary()
+        self.metrics = {
+            "checkouts": 0,
+            "checkout_wait_sec": 0.0,
+            "max_checkout_wait_sec": 0.0,
+            "checkout_timeouts": 0,
+            "in_use": 0,
+            "peak_in_use": 0,
+            "saturated_checkouts": 0,  # checkouts that found every connection busy
+            "discarded_invalid": 0,
+            "recycled_expired": 0,
+            "hold_by_caller": {},  # time between getconn and putconn, per name
+        }
+
+    def _get_dsn(self) -> str:
+        with self._lock:
+            if self._dsn is not None:
+                return self._dsn
+            dsn = os.environ.get(self.dsn_env)
+            if not dsn:
+                raise EnvironmentError(f"Environment variable {self.dsn_env} must be set.")
+            self._dsn = dsn
+        for _ in range(self.minconn):
+            self._release(self._connect())
+        return dsn
+
+    def _connect(self):
+        conn = psycopg2.connect(self._dsn)
+        with self._lock:
+            self._connections[conn] = {"created": time.perf_counter(), "generation": self._generation, "prepared": set()}
+        return conn
+
+    def _release(self, conn):
+        with self._lock:
+            self._idle.append(conn)
+
+    def getconn(self, name: str = "unnamed"):
+        """Check out a healthy connection; name attributes its hold time in get_metrics()."""
+        self._get_dsn()
+        start_time = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.metrics["saturated_checkouts"] += 1
+            if not self._slots.acquire(timeout=self.checkout_timeout_sec):
+                with self._lock:
+                    self.metrics["checkout_timeouts"] += 1
+                raise pool.PoolError(f"No connection available after {self.checkout_timeout_sec}s ({self.maxconn} in use)")
+
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    conn = self._connect()
+                    break
+                if self._healthy(conn):
+                    break
+                self._discard(conn)
+                with self._lock:
+                    self.metrics["discarded_invalid"] += 1
+        except Exception:
+            self._slots.release()
+            raise
+
+        now = time.perf_counter()
+        with self._lock:
+            info = self._connections[conn]
+            info.update(name=name, checked_out=now)
+            wait = now - start_time
+            self.metrics["checkouts"] += 1
+            self.metrics["checkout_wait_sec"] += wait
+            self.metrics["max_checkout_wait_sec"] = max(self.metrics["max_checkout_wait_sec"], wait)
+            self.metrics["in_use"] += 1
+            self.metrics["peak_in_use"] = max(self.metrics["peak_in_use"], self.metrics["in_use"])
+        return conn
+
+    def putconn(self, conn, close: bool = False):
+        """Return a connection; it is closed instead if asked, broken, past its max lifetime or checked out before closeall()."""
+        now = time.perf_counter()
+        with self._lock:
+            info = self._connections.get(conn, {})
+            if "checked_out" in info:
+                self._record_hold(info.pop("name"), now - info.pop("checked_out"))
+            info["last_used"] = now
+            expired = now - info.get("created", now) > self.max_lifetime_sec
+            if expired:
+                self.metrics["recycled_expired"] += 1
+            stale = info.get("generation") != self._generation
+            self.metrics["in_use"] -= 1
+
+        try:
+            if close or expired or stale or conn.closed:
+                self._discard(conn)
+            else:
+                if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()  # leave no transaction open for the next caller
+                self._release(conn)
+        except Exception:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        info = self._connections.get(conn)
+        if info is None or time.perf_counter() - info.get("last_used", info["created"]) < self.validate_idle_sec:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self._connections.pop(conn, None)
+        if not conn.closed:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _record_hold(self, name: str, elapsed: float):
+        hold = self.metrics["hold_by_caller"].setdefault(name, {"calls": 0, "total_sec": 0.0, "max_sec": 0.0})
+        hold["calls"] += 1
+        hold["total_sec"] += elapsed
+        hold["max_sec"] = max(hold["max_sec"], elapsed)
+
+    def execute_prepared(self, cursor, name: str, sql: str, params: tuple):
+        """
+        Run sql (with $1, $2... placeholders, each used once and in order)
+        as a server-side prepared statement, preparing it the first time
+        this connection sees it. Falls back to a plain execute when
+        PREPARE_STATEMENTS is off.
+        """
+        if not PREPARE_STATEMENTS:
+            cursor.execute(re.sub(r"\$\d+", "%s", sql), params)
+            return
+        with self._lock:
+            prepared = self._connections[cursor.connection]["prepared"]
+            needs_prepare = name not in prepared
+        if needs_prepare:
+            cursor.execute(f"PREPARE {name} AS {sql}")
+            with self._lock:
+                prepared.add(name)
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+    def get_metrics(self) -> dict:
+        """Checkout wait, saturation and per-caller hold time so far."""
+        with self._lock:
+            metrics = json.loads(json.dumps(self.metrics))
+        checkouts = metrics["checkouts"]
+        metrics["avg_checkout_wait_sec"] = metrics["checkout_wait_sec"] / checkouts if checkouts else 0.0
+        metrics["max_conn"] = self.maxconn
+        metrics["saturation"] = metrics["in_use"] / self.maxconn
+        for hold in metrics["hold_by_caller"].values():
+            hold["avg_sec"] = hold["total_sec"] / hold["calls"]
+        return metrics
+
+    def closeall(self):
+        """Close the idle connections; checked-out ones are closed when returned."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._generation += 1
+        for conn in idle:
+            self._discard(conn)
@@ -0,0 +1,303 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import urlparse
+import audio_scraper
+import argparse
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_FRONTIER_PATH = "crawl_frontier.db"
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+# Page fetches submitted ahead of the consumer, per worker
+FETCH_WINDOW_PER_WORKER = 2
+
+
+class RundownNotFound(Exception):
+    """The rundown markup was missing over HTTP; the page has to be rendered in a browser."""
+
+    def __init__(self, url: str, etag: str, last_modified: str):
+        super().__init__(f"Rundown markup not found over HTTP: {url}")
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class CrawlFrontier:
+    """
+    Per-URL crawl state in a local SQLite file so an interrupted date-range
+    crawl resumes where it stopped. Safe to share across threads (e.g. a
+    pipeline feeder and the stage that finishes a page's stories).
+    """
+
+    def __init__(self, path: str = DEFAULT_FRONTIER_PATH):
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                program TEXT NOT NULL,
+                date TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                etag TEXT,
+                last_modified TEXT,
+                last_fetched TEXT,
+                stories INTEGER,
+                error TEXT
+            )
+        """)
+        self.conn.commit()
+
+    def add(self, program: str, date: str, url: str):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO frontier (url, program, date) VALUES (?, ?, ?)",
+                (url, program, date)
+            )
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+
+    def get_urls(self, states: tuple[str, ...]) -> list[tuple]:
+        """(url, etag, last_modified) for urls in the given states, oldest date first."""
+        placeholders = ", ".join("?" for _ in states)
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT url, etag, last_modified FROM frontier WHERE state IN ({placeholders}) ORDER BY date, program",
+                states
+            ).fetchall()
+
+    def mark_done(self, url: str, etag: str, last_modified: str, stories: int):
+        with self._lock:
+            self.conn.execute(
+                """
+                UPDATE frontier
+                SET state = 'done', etag = ?, last_modified = ?, last_fetched = ?, stories = ?, error = NULL
+                WHERE url = ?
+                """,
+                (etag, last_modified, _now(), stories, url)
+            )
+            self.conn.commit()
+
+    def mark_failed(self, url: str, error: str):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE frontier SET state = 'failed', last_fetched = ?, error = ? WHERE url = ?",
+                (_now(), error, url)
+            )
+            self.conn.commit()
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.conn.execute("SELECT state, count(*) FROM frontier GROUP BY state").fetchall())
+
+class PageTracker:
+    """
+    Marks crawled pages done once every one of their stories has been
+    handled, for consumers that finish stories later and on other threads
+    (e.g. the store stage of a pipeline). A page with a failed story is
+    marked failed instead, so the next run crawls it again.
+    """
+
+    def __init__(self, frontier: CrawlFrontier):
+        self.frontier = frontier
+        self._lock = threading.Lock()
+        self._pages = {}  # url -> {"etag", "last_modified", "stories", "remaining", "failed"}
+
+    def add(self, url: str, etag: str, last_modified: str, stories: list[dict]):
+        """Start tracking a page; each story is tagged with its page_url."""
+        if not stories:
+            self.frontier.mark_done(url, etag, last_modified, 0)
+            return
+        for story in stories:
+            story['page_url'] = url
+        with self._lock:
+            self._pages[url] = {"etag": etag, "last_modified": last_modified, "stories": len(stories),
+                                "remaining": len(stories), "failed": 0}
+
+    def finish(self, story: dict, ok: bool = True):
+        """Record that story was handled (stored or deliberately skipped) or, if not ok, failed."""
+        url = story.get('page_url')
+        with self._lock:
+            page = self._pages.get(url)
+            if page is None:
+                return
+            page["remaining"] -= 1
+            page["failed"] += not ok
+            if page["remaining"]:
+                return
+            del self._pages[url]
+        if page["failed"]:
+            self.frontier.mark_failed(url, f"{page['failed']} of {page['stories']} story(ies) failed")
+        else:
+            self.frontier.mark_done(url, page["etag"], page["last_modified"], page["stories"])
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least min_interval seconds apart, across threads."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_allowed = {}
+
+    def wait(self, url: str):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def date_range(start: str, end: str):
+    """YYYY-MM-DD strings from start to end inclusive."""
+    day = date.fromisoformat(start)
+    last = date.fromisoformat(end)
+    while day <= last:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+def fetch_rundown(url: str, etag: str, last_modified: str, rate_limiter: HostRateLimiter):
+    """
+    Fetch and parse one rundown page with a conditional request.
+    Returns (stories, etag, last_modified); stories is None when the page is unchanged.
+    Raises RundownNotFound when the page needs a browser.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    fetcher = audio_scraper.get_http_fetcher()
+    rate_limiter.wait(url)
+    response = fetcher.session.get(url, headers=headers, timeout=fetcher.timeout)
+    if response.status_code == 304:
+        return None, etag, last_modified
+    response.raise_for_status()
+
+    tree = audio_scraper._parse_html(response.text)
+    if not audio_scraper.has_rundown(tree):
+        raise RundownNotFound(url, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return audio_scraper.parse_stories(tree), response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+def render_rundowns(urls: list[str], concurrency: int = 4) -> dict:
+    """Render pages in one shared browser session. Returns url -> stories, or the exception that failed it."""
+    async def run():
+        async with audio_scraper.ScraperSession(concurrency) as session:
+            return await asyncio.gather(*(session.scrape(url) for url in urls), return_exceptions=True)
+    return dict(zip(urls, asyncio.run(run())))
+
+def crawl_pages(start: str, end: str, frontier: CrawlFrontier = None, workers: int = 4,
+                min_interval: float = 1.0, recrawl: bool = False, tracker: PageTracker = None):
+    """
+    Crawl every program rundown page between start and end (YYYY-MM-DD) and
+    yield (url, stories) as each page completes. Pages already marked done
+    are skipped unless recrawl is set, in which case they are re-requested
+    conditionally and only yielded if they changed. A page is marked done
+    only when the consumer asks for the next one, so pages whose stories
+    were not handled (the consumer raised or stopped) are crawled again on
+    the next run. With a tracker, pages are handed to it instead and marked
+    done once the consumer finishes all of their stories.
+
+    At most FETCH_WINDOW_PER_WORKER pages per worker are fetched ahead of
+    the consumer, so stopping early does not keep crawling the whole range.
+    Pages that need a browser are rendered together in one session once
+    the HTTP fetches are done.
+    """
+    frontier = frontier or CrawlFrontier()
+    for day in date_range(start, end):
+        for program, url in audio_scraper.program_urls(day).items():
+            frontier.add(program, day, url)
+    frontier.commit()
+
+    states = (PENDING, FAILED, DONE) if recrawl else (PENDING, FAILED)
+    targets = frontier.get_urls(states)
+    print(f"Crawling {len(targets)} page(s): {frontier.counts()}")
+
+    rate_limiter = HostRateLimiter(min_interval)
+    remaining = iter(targets)
+    browser_pages = {}  # url -> (etag, last_modified)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {}
+        def submit_next():
+            target = next(remaining, None)
+            if target:
+                url, etag, last_modified = target
+                futures[executor.submit(fetch_rundown, url, etag, last_modified, rate_limiter)] = url
+        for _ in range(workers * FETCH_WINDOW_PER_WORKER):
+            submit_next()
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = futures.pop(future)
+                submit_next()
+                try:
+                    stories, etag, last_modified = future.result()
+                except RundownNotFound as e:
+                    browser_pages[url] = (e.etag, e.last_modified)
+                    continue
+                except Exception as e:
+                    print(f"❌ Error crawling {url}: {e}")
+                    frontier.mark_failed(url, str(e))
+                    continue
+                if stories is None:
+                    print(f"Unchanged since last crawl: {url}")
+                    frontier.mark_done(url, etag, last_modified, 0)
+                    continue
+                yield from _page(frontier, tracker, url, etag, last_modified, stories)
+    finally:
+        # Drop queued fetches when the consumer stops early
+        executor.shutdown(cancel_futures=True)
+
+    if browser_pages:
+        print(f"Rundown markup not found over HTTP for {len(browser_pages)} page(s), falling back to browser")
+        for url, stories in render_rundowns(list(browser_pages), workers).items():
+            if isinstance(stories, Exception):
+                print(f"❌ Error crawling {url}: {stories}")
+                frontier.mark_failed(url, str(stories))
+                continue
+            etag, last_modified = browser_pages[url]
+            yield from _page(frontier, tracker, url, etag, last_modified, stories)
+
+def _page(frontier: CrawlFrontier, tracker: PageTracker, url: str, etag: str, last_modified: str, stories: list[dict]):
+    if tracker:
+        tracker.add(url, etag, last_modified, stories)
+        yield url, stories
+    else:
+        yield url, stories
+        frontier.mark_done(url, etag, last_modified, len(stories))
+
+def crawl(start: str, end: str, frontier: CrawlFrontier = None, workers: int = 4,
+          min_interval: float = 1.0, recrawl: bool = False, tracker: PageTracker = None):
+    """
+    Like crawl_pages, but yields the stories one by one. A page is marked
+    done once all of its stories have been consumed, or with a tracker,
+    once tracker.finish has been called for each of them.
+    """
+    for _, stories in crawl_pages(start, end, frontier, workers, min_interval, recrawl, tracker):
+        yield from stories
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--from", dest="start", required=True, help="First date in YYYY-MM-DD format")
+    parser.add_argument("--to", dest="end", required=True, help="Last date in YYYY-MM-DD format")
+    parser.add_argument("--frontier", default=DEFAULT_FRONTIER_PATH, help="SQLite crawl frontier path")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent page fetches")
+    parser.add_argument("--min_interval", type=float, default=1.0, help="Seconds between requests to the same host")
+    parser.add_argument("--recrawl", action="store_true", help="Re-request pages already crawled")
+    args = parser.parse_args()
+
+    for story in crawl(args.start, args.end, CrawlFrontier(args.frontier), args.workers, args.min_interval, args.recrawl):
+        print(json.dumps(story, ensure_ascii=False))
@@ -0,0 +1,149 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+DEFAULT_CACHE_DIR = os.getenv("DIARIZATION_CACHE_DIR", "diarization_cache")
+DEFAULT_CACHE_BYTES = int(os.getenv("DIARIZATION_CACHE_BYTES", 256 * 1024 ** 2))
+
+ENTRY_SUFFIX = ".json.gz"
+
+
+def file_hash(path: str) -> str:
+    """sha256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_key(content_hash: str, params: dict) -> str:
+    """Key for one audio content hash diarized with the given model/pipeline parameters."""
+    return hashlib.sha256(f"{content_hash}:{json.dumps(params, sort_keys=True)}".encode()).hexdigest()[:32]
+
+def _pack(segments: list[dict]) -> dict:
+    # Speaker labels repeat on every row; store them once and index into them
+    speakers = sorted({seg["speaker_id"] for seg in segments})
+    return {
+        "speakers": speakers,
+        "rows": [
+            [seg["segment_id"], seg["start_time"], seg["end_time"], seg["duration_sec"], speakers.index(seg["speaker_id"])]
+            for seg in segments
+        ],
+    }
+
+def _unpack(packed: dict) -> list[dict]:
+    return [
+        {
+            "segment_id": segment_id,
+            "speaker_id": packed["speakers"][speaker],
+            "start_time": start,
+            "end_time": end,
+            "duration_sec": duration,
+        }
+        for segment_id, start, end, duration, speaker in packed["rows"]
+    ]
+
+class DiarizationCache:
+    """
+    Content-addressed diarization results on disk: one gzipped JSON file
+    per (audio hash, parameters) key holding the raw and consolidated
+    segments. Least recently used entries are evicted past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.metrics = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def get(self, key: str):
+        """Returns {"raw": [...], "segments": [...], "consolidation_version": n} or None."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            with self._lock:
+                self.metrics["misses"] += 1
+            return None
+        with self._lock:
+            self.metrics["hits"] += 1
+        return {
+            "raw": _unpack(entry["raw"]),
+            "segments": _unpack(entry["segments"]),
+            "consolidation_version": entry["consolidation_version"],
+        }
+
+    def put(self, key: str, raw: list[dict], segments: list[dict], consolidation_version: int):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        entry = {"raw": _pack(raw), "segments": _pack(segments), "consolidation_version": consolidation_version}
+        with gzip.open(tmp_path, "wt") as f:
+            json.dump(entry, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.metrics["writes"] += 1
+        self.evict(keep={path})
+
+    def evict(self, keep: set = frozenset()):
+        """Delete least recently used entries until the cache fits max_bytes."""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if name.endswith(ENTRY_SUFFIX):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path in keep:
+                    continue
+                os.remove(path)
+                total -= size
+                self.metrics["evictions"] += 1
+
+    def get_metrics(self) -> dict:
+        metrics = dict(self.metrics)
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = metrics["hits"] / lookups if lookups else 0.0
+        metrics["entries"], metrics["bytes"] = 0, 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(ENTRY_SUFFIX):
+                metrics["entries"] += 1
+                metrics["bytes"] += os.path.getsize(os.path.join(self.cache_dir, name))
+        return metrics
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(ENTRY_SUFFIX):
+                os.remove(os.path.join(self.cache_dir, name))
+
+_caches = {}
+
+def get_diarization_cache(cache_dir: str = DEFAULT_CACHE_DIR) -> DiarizationCache:
+    """Process-wide cache per directory."""
+    if cache_dir not in _caches:
+        _caches[cache_dir] = DiarizationCache(cache_dir)
+    return _caches[cache_dir]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cache_dir", default=DEFAULT_CACHE_DIR, help="Diarization cache directory")
+    parser.add_argument("--clear", action="store_true", help="Delete every cached result")
+    args = parser.parse_args()
+
+    cache = DiarizationCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+    print(json.dumps(cache.get_metrics(), indent=2))
@@ -1,32 +1,22 @@
 import os
-import requests
 import torch
 import torchaudio
 import argparse
+import hashlib
+import json
 import time
 from pyannote.audio import Pipeline
 from pydub import AudioSegment
-from urllib.parse import urlparse
+from audio_editor import DecodedAudio, MODEL_SAMPLE_RATE
+from downloader import DEFAULT_CACHE_DIR, get_download_manager
+from diarization_cache import DiarizationCache, get_diarization_cache, cache_key, file_hash
 
 if "HUGGING_FACE_TOKEN" not in os.environ:
     raise EnvironmentError("Environment variable HUGGING_FACE_TOKEN must be set.")
 
-def download_audio(url: str, output_folder: str = "downloads") -> str:
-    os.makedirs(output_folder, exist_ok=True)
-    parsed = urlparse(url)
-    filename = os.path.basename(parsed.path) or "audio.mp3"
-    filepath = os.path.join(output_folder, filename)
-
-    # print(f"Downloading {url}...")
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    with open(filepath, "wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
-    print(f"\n 👂🏽 LISTEN HERE: {filepath}\n")
-
-    #filepath = url
-    return filepath
+def download_audio(url: str, output_folder: str = DEFAULT_CACHE_DIR) -> str:
+    """Download url into the shared download cache (resumable, retried, size-validated)."""
+    return get_download_manager(output_folder).get(url)
 
 def convert_to_wav(mp3_path: str) -> str:
     audio = AudioSegment.from_file(mp3_path)
@@ -72,32 +62,198 @@ def consolidate_segments(segments: list[dict]) -> list[dict]:
     consolidated.append(prev)
     return consolidated
 
+DIARIZATION_MODEL = "pyannote/speaker-diarization-3.1"
+
+# Bump when create_segments changes, so cached raw segments are not reused.
+PIPELINE_VERSION = 1
+# Bump when consolidate_segments changes; cached raw segments are re-consolidated without inference.
+CONSOLIDATION_VERSION = 1
+
+# Segmentation/embedding batch sizes per device. The GPU values keep a 12 GB card
+# busy without running out of memory; CPU gains little from batching past 8.
+BATCH_SIZES = {
+    "cuda": {"segmentation": 32, "embedding": 32},
+    "cpu": {"segmentation": 8, "embedding": 8},
+}
+
+def select_device() -> str:
+    """Use CUDA when available, otherwise fall back to CPU."""
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+def configure_cpu_threads(num_threads: int = None):
+    """Use every available core for intra-op parallelism unless told otherwise."""
+    num_threads = num_threads or os.cpu_count() or 1
+    torch.set_num_threads(num_threads)
+    return num_threads
+
+class DiarizationEngine:
+    """
+    Holds a loaded pyannote pipeline so many files can be diarized without
+    paying the model load for each one.
+    """
+
+    def __init__(self, model: str = DIARIZATION_MODEL, device: str = None, num_threads: int = None,
+                 cache: DiarizationCache = None):
+        self.model = model
+        self.device = torch.device(device or select_device())
+        self.num_threads = num_threads
+        self.cache = cache
+        self.pipeline = None
+        self.metrics = {
+            "model_load_sec": 0.0,
+            "files": 0,
+            "audio_sec": 0.0,
+            "inference_sec": 0.0,
+        }
+
+    def load(self):
+        """Load the pipeline if it has not been loaded yet."""
+        if self.pipeline is None:
+            start_time = time.time()
+            pipeline = Pipeline.from_pretrained(self.model, use_auth_token=os.getenv("HUGGINGFACE_TOKEN"))
+            pipeline.to(self.device)
+            batch_sizes = BATCH_SIZES[self.device.type]
+            pipeline.segmentation_batch_size = batch_sizes["segmentation"]
+            pipeline.embedding_batch_size = batch_sizes["embedding"]
+            if self.device.type == "cpu":
+                configure_cpu_threads(self.num_threads)
+            self.pipeline = pipeline
+            self.metrics["model_load_sec"] = time.time() - start_time
+            print(f"Diarization model loaded on {self.device} in {self.metrics['model_load_sec']:.2f} seconds")
+        return self.pipeline
+
+    def diarize(self, audio) -> list[dict]:
+        """
+        Diarize a WAV path or an in-memory waveform.
+        Args:
+            audio: Path to an audio file, a DecodedAudio, a (waveform, sample_rate)
+                tuple or a {"waveform": ..., "sample_rate": ...} dict.
+        Returns:
+            Consolidated speaker segments.
+        """
+        key = self._cache_key(audio) if self.cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached:
+                print("Diarization loaded from cache")
+                if cached["consolidation_version"] != CONSOLIDATION_VERSION:
+                    segments = consolidate_segments(cached["raw"])
+                    self.cache.put(key, cached["raw"], segments, CONSOLIDATION_VERSION)
+                    return segments
+                return cached["segments"]
+
+        pipeline = self.load()
+        waveform, sample_rate = _load_waveform(audio)
+
+        start_time = time.time()
+        diarization = pipeline({"waveform": waveform, "sample_rate": sample_rate})
+        elapsed = time.time() - start_time
+        self.metrics["files"] += 1
+        self.metrics["audio_sec"] += waveform.shape[-1] / sample_rate
+        self.metrics["inference_sec"] += elapsed
+        print(f"Diarization completed in {elapsed:.2f} seconds")
+
+        print("\n--- Speaker Segments ---")
+        raw = create_segments(diarization)
+        segments = consolidate_segments(raw)
+        if key:
+            self.cache.put(key, raw, segments, CONSOLIDATION_VERSION)
+        return segments
+
+    def _cache_key(self, audio):
+        """Cache key from the audio's content hash and everything that affects the raw segments."""
+        if isinstance(audio, str):
+            content_hash, source = file_hash(audio), "file"
+        elif isinstance(audio, DecodedAudio):
+            # Diarized from the decoded samples, which differ from torchaudio's decode of the file
+            content_hash, source = file_hash(audio.path), f"decoded@{MODEL_SAMPLE_RATE}"
+        else:
+            waveform, sample_rate = _load_waveform(audio)
+            tensor = waveform if isinstance(waveform, torch.Tensor) else torch.as_tensor(waveform)
+            content_hash = hashlib.sha256(tensor.contiguous().cpu().numpy().tobytes()).hexdigest()
+            source = f"waveform@{sample_rate}"
+        return cache_key(content_hash, {"model": self.model, "pipeline_version": PIPELINE_VERSION, "source": source})
+
+    def diarize_many(self, audio_paths: list[str]) -> dict[str, list[dict]]:
+        """
+        Diarize a batch of files in one pass with a single loaded pipeline
+        (loaded only if some file misses the cache).
+        Returns a map of path to consolidated segments. Failures are reported
+        and skipped so one bad file does not stop the batch.
+        """
+        # diarize() loads the model on the first cache miss, so an all-hit batch never loads it
+        loaded = self.pipeline is not None
+        results = {}
+        start_time = time.time()
+        audio_sec = self.metrics["audio_sec"]
+        for path in audio_paths:
+            try:
+                results[path] = self.diarize(path)
+            except Exception as e:
+                print(f"❌ Error diarizing {path}: {e}")
+        wall_sec = time.time() - start_time
+        if not loaded and self.pipeline is not None:
+            wall_sec -= self.metrics["model_load_sec"]
+        audio_sec = self.metrics["audio_sec"] - audio_sec
+        print(f"Diarized {len(results)}/{len(audio_paths)} files: {audio_sec:.1f}s of audio in {wall_sec:.1f}s "
+              f"({audio_sec / wall_sec if wall_sec else 0.0:.1f} audio-sec/wall-sec)")
+        return results
+
+    def get_metrics(self) -> dict:
+        """Model load time vs. cumulative and average per-file inference time."""
+        metrics = dict(self.metrics)
+        files = metrics["files"]
+        metrics["avg_inference_sec"] = metrics["inference_sec"] / files if files else 0.0
+        metrics["audio_sec_per_inference_sec"] = metrics["audio_sec"] / metrics["inference_sec"] if metrics["inference_sec"] else 0.0
+        metrics["device"] = self.device.type
+        if self.cache:
+            metrics["cache"] = self.cache.get_metrics()
+        return metrics
+
+def _load_waveform(audio):
+    if isinstance(audio, str):
+        return torchaudio.load(audio)
+    if isinstance(audio, DecodedAudio):
+        return torch.from_numpy(audio.samples()).unsqueeze(0), MODEL_SAMPLE_RATE
+    if isinstance(audio, dict):
+        return audio["waveform"], audio["sample_rate"]
+    return audio
+
+_engine = None
+
+def get_engine() -> DiarizationEngine:
+    """Return the process-wide engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = DiarizationEngine(cache=get_diarization_cache())
+    return _engine
+
 def diarize_audio(wav_path: str) -> list[dict]:
     # print(f"Diarizing audio file: {wav_path}")
-    start_time = time.time()
-    waveform, sample_rate = torchaudio.load(wav_path)
-    
-    pipeline = Pipeline.from_pretrained("pyannote/speaker-diarization-3.1", use_auth_token=os.getenv("HUGGINGFACE_TOKEN"))
-    pipeline.to(torch.device("cuda"))
-    diarization = pipeline({"waveform": waveform, "sample_rate": sample_rate})
-    print(f"Diarization completed in {time.time() - start_time:.2f} seconds")
-
-    print("\n--- Speaker Segments ---")
-    segments = create_segments(diarization)
-    if not segments:
-        return []
-    
-    consolidated = consolidate_segments(segments)
-    return consolidated
+    return get_engine().diarize(wav_path)
+
+def diarize_batch(wav_paths: list[str]) -> dict[str, list[dict]]:
+    return get_engine().diarize_many(wav_paths)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--audio_url", required=True, help="URL of the audio file to diarize")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--audio_url", nargs="+", help="URL(s) of the audio file(s) to diarize")
+    group.add_argument("--batch", nargs="+", help="Local WAV paths to diarize in one pass")
+    parser.add_argument("--device", choices=["cpu", "cuda"], help="Override automatic device selection")
+    parser.add_argument("--threads", type=int, help="CPU threads to use when running on CPU")
+    parser.add_argument("--no_cache", action="store_true", help="Always run the model instead of reusing cached results")
     args = parser.parse_args()
-    audio_url = args.audio_url
-    downloaded_path = download_audio(audio_url)
-    wav_path = convert_to_wav(downloaded_path)
-    diarize_audio(wav_path)
+    engine = DiarizationEngine(device=args.device, num_threads=args.threads, cache=None if args.no_cache else get_diarization_cache())
+    if args.batch:
+        results = engine.diarize_many(args.batch)
+        print(json.dumps(results, indent=2))
+    else:
+        for audio_url in args.audio_url:
+            downloaded_path = download_audio(audio_url)
+            wav_path = convert_to_wav(downloaded_path)
+            engine.diarize(wav_path)
+    print(json.dumps(engine.get_metrics(), indent=2))
 
 # 1 min wav file
 # CPU: 44.43 seconds
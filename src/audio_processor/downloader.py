@@ -0,0 +1,189 @@
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse, parse_qs
+import argparse
+import hashlib
+import json
+import os
+import random
+import requests
+import threading
+import time
+import urllib3
+
+DEFAULT_CACHE_DIR = "downloads"
+DEFAULT_CACHE_BYTES = int(os.getenv("DOWNLOAD_CACHE_BYTES", 5 * 1024 ** 3))
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+# Grow the read size while chunks arrive faster than this
+FAST_CHUNK_SEC = 0.1
+
+PARTIAL_SUFFIX = ".part"
+
+
+class DownloadError(Exception):
+    """Raised when a download fails validation or exhausts its retries."""
+
+
+def expected_size(url: str):
+    """The byte size NPR encodes in audio URLs (e.g. ...mp3?size=3470360), if present."""
+    size = parse_qs(urlparse(url).query).get("size")
+    return int(size[0]) if size and size[0].isdigit() else None
+
+def cache_key(url: str) -> str:
+    """Cache file name for url. The query string is ignored so scraped and player URLs share an entry."""
+    parsed = urlparse(url)
+    digest = hashlib.sha256(f"{parsed.netloc}{parsed.path}".encode()).hexdigest()[:24]
+    extension = os.path.splitext(parsed.path)[1] or ".mp3"
+    return f"{digest}{extension}"
+
+class DownloadManager:
+    """
+    Downloads audio into an on-disk cache keyed by URL.
+
+    Partial files are resumed with HTTP Range requests, failed attempts are
+    retried with exponential backoff, completed files are checked against
+    the size= query parameter (or Content-Length), and the least recently
+    used files are evicted once the cache exceeds max_cache_bytes.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_cache_bytes: int = DEFAULT_CACHE_BYTES,
+                 workers: int = 4, retries: int = 4, backoff_sec: float = 1.0, timeout: tuple = (10, 60)):
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.workers = workers
+        self.retries = retries
+        self.backoff_sec = backoff_sec
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def cache_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, cache_key(url))
+
+    def get(self, url: str) -> str:
+        """Return the local path for url, downloading it unless it is already cached."""
+        path = self.cache_path(url)
+        with self._url_lock(path):
+            if os.path.exists(path):
+                os.utime(path)  # mark as recently used
+                return path
+            self._download(url, path)
+        self.evict(keep={path})
+        print(f"\n 👂🏽 LISTEN HERE: {path}\n")
+        return path
+
+    def get_many(self, urls: list[str]) -> dict[str, str]:
+        """Download urls concurrently. Returns url -> path; failed urls are reported and left out."""
+        def get_one(url):
+            try:
+                return self.get(url)
+            except Exception as e:
+                print(f"❌ Error downloading {url}: {e}")
+                return None
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            paths = dict(zip(urls, executor.map(get_one, urls)))
+        return {url: path for url, path in paths.items() if path}
+
+    def evict(self, keep: set = frozenset()):
+        """Delete least recently used cache files until the cache fits max_cache_bytes."""
+        with self._evict_lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if name.endswith(PARTIAL_SUFFIX) or not os.path.isfile(path):
+                    continue
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_cache_bytes:
+                    break
+                if path in keep:
+                    continue
+                os.remove(path)
+                total -= size
+                print(f"Evicted {path} from download cache")
+
+    def _url_lock(self, path: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def _download(self, url: str, path: str):
+        partial_path = path + PARTIAL_SUFFIX
+        for attempt in range(self.retries + 1):
+            try:
+                self._fetch(url, partial_path)
+                self._validate(url, partial_path)
+                os.replace(partial_path, path)
+                return
+            # Reading response.raw raises urllib3 errors (e.g. ProtocolError on a dropped
+            # connection, ReadTimeoutError on a stall) that requests does not wrap
+            except (requests.RequestException, urllib3.exceptions.HTTPError, OSError, DownloadError) as e:
+                if attempt == self.retries:
+                    raise DownloadError(f"Giving up on {url} after {attempt + 1} attempt(s): {e}") from e
+                delay = self.backoff_sec * 2 ** attempt + random.uniform(0, self.backoff_sec)
+                print(f"Download of {url} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _fetch(self, url: str, partial_path: str):
+        """Fetch url into partial_path, resuming from its current size when the server supports ranges."""
+        offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 416:
+                # Nothing left to fetch; validation decides whether the partial file is complete
+                return
+            response.raise_for_status()
+            if response.status_code != 206:
+                offset = 0  # server ignored the range; start over
+
+            chunk_size = MIN_CHUNK_SIZE
+            with open(partial_path, "ab" if offset else "wb") as f:
+                while True:
+                    start_time = time.monotonic()
+                    chunk = response.raw.read(chunk_size, decode_content=True)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    if len(chunk) == chunk_size and time.monotonic() - start_time < FAST_CHUNK_SEC:
+                        chunk_size = min(chunk_size * 2, MAX_CHUNK_SIZE)
+
+            content_length = response.headers.get("Content-Length")
+            if content_length is not None and not response.headers.get("Content-Encoding") and os.path.getsize(partial_path) != offset + int(content_length):
+                raise DownloadError(f"Connection closed early for {url}")
+
+    def _validate(self, url: str, partial_path: str):
+        size = expected_size(url)
+        actual = os.path.getsize(partial_path)
+        if size is not None and actual != size:
+            if actual > size:
+                os.remove(partial_path)
+            raise DownloadError(f"Expected {size} bytes for {url}, got {actual}")
+
+_managers = {}
+
+def get_download_manager(cache_dir: str = DEFAULT_CACHE_DIR) -> DownloadManager:
+    """Process-wide manager per cache directory."""
+    if cache_dir not in _managers:
+        _managers[cache_dir] = DownloadManager(cache_dir)
+    return _managers[cache_dir]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("urls", nargs="+", help="Audio URLs to download")
+    parser.add_argument("--cache_dir", default=DEFAULT_CACHE_DIR, help="Download cache directory")
+    parser.add_argument("--max_cache_bytes", type=int, default=DEFAULT_CACHE_BYTES, help="Cache size budget in bytes")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent downloads")
+    args = parser.parse_args()
+
+    manager = DownloadManager(args.cache_dir, args.max_cache_bytes, args.workers)
+    print(json.dumps(manager.get_many(args.urls), indent=2))
@@ -1,7 +1,8 @@
-from resemblyzer import VoiceEncoder, preprocess_wav
+from resemblyzer import VoiceEncoder, preprocess_wav, audio
 from pydub import AudioSegment
-from audio_editor import extract_segment
+from audio_editor import extract_segment, DecodedAudio, MODEL_SAMPLE_RATE
 import numpy as np
+import torch
 import argparse
 import tempfile
 import os
@@ -16,13 +17,145 @@ import os
 #         return tmp_wav.name
 #     return audio_path
 
-def generate_embedding(segment_wav_path: str):
+class EmbeddingService:
+    """
+    Holds one loaded VoiceEncoder and embeds many utterances per forward pass.
+
+    Utterances may be mono float32 samples at MODEL_SAMPLE_RATE, audio file
+    paths, or (path, start_sec, end_sec) tuples. Each file referenced by a
+    tuple is decoded once per call.
+    """
+
+    def __init__(self, device: str = None, max_batch_partials: int = 256):
+        self.encoder = VoiceEncoder(device=device)
+        self.max_batch_partials = max_batch_partials
+
+    def embed(self, utterance) -> np.ndarray:
+        return self.embed_many([utterance])[0]
+
+    def embed_many(self, utterances: list) -> list[np.ndarray]:
+        """Return one L2-normalized 256-d embedding per utterance, in order."""
+        decoded = {}
+        mels = []
+        counts = []
+        for utterance in utterances:
+            wav = self._preprocess(utterance, decoded)
+            partials = self._partial_mels(wav)
+            mels.append(partials)
+            counts.append(len(partials))
+
+        all_mels = np.concatenate(mels)
+        partial_embeds = []
+        with torch.no_grad():
+            for start in range(0, len(all_mels), self.max_batch_partials):
+                batch = torch.from_numpy(all_mels[start:start + self.max_batch_partials]).to(self.encoder.device)
+                partial_embeds.append(self.encoder(batch).cpu().numpy())
+        partial_embeds = np.concatenate(partial_embeds)
+
+        embeddings = []
+        offset = 0
+        for count in counts:
+            raw_embed = partial_embeds[offset:offset + count].mean(axis=0)
+            embeddings.append(raw_embed / np.linalg.norm(raw_embed, 2))
+            offset += count
+        return embeddings
+
+    def _preprocess(self, utterance, decoded: dict) -> np.ndarray:
+        if isinstance(utterance, np.ndarray):
+            return preprocess_wav(utterance, source_sr=MODEL_SAMPLE_RATE)
+        if isinstance(utterance, tuple):
+            path, start_sec, end_sec = utterance
+            if path not in decoded:
+                decoded[path] = DecodedAudio(path)
+            return preprocess_wav(decoded[path].slice_samples(start_sec, end_sec), source_sr=MODEL_SAMPLE_RATE)
+        return preprocess_wav(utterance)
+
+    def _partial_mels(self, wav: np.ndarray) -> np.ndarray:
+        """Mel spectrogram windows for one utterance, as in VoiceEncoder.embed_utterance."""
+        wav_slices, mel_slices = self.encoder.compute_partial_slices(len(wav))
+        max_wave_length = wav_slices[-1].stop
+        if max_wave_length >= len(wav):
+            wav = np.pad(wav, (0, max_wave_length - len(wav)), "constant")
+        mel = audio.wav_to_mel_spectrogram(wav)
+        return np.array([mel[s] for s in mel_slices])
+
+_service = None
+
+def get_embedding_service() -> EmbeddingService:
+    """Return the process-wide service, loading the encoder on first use."""
+    global _service
+    if _service is None:
+        _service = EmbeddingService()
+    return _service
+
+def generate_embedding(segment_wav):
+    """
+    Embed a WAV path or mono float32 samples at MODEL_SAMPLE_RATE
+    (e.g. DecodedAudio.slice_samples). Returns a list for DB persistence.
+    """
     print('Starting embedding generation...')
-    wav = preprocess_wav(segment_wav_path)
-    encoder = VoiceEncoder()
-    embedding = encoder.embed_utterance(wav)
+    embedding = get_embedding_service().embed(segment_wav)
     return embedding.tolist()
 
+# Turns shorter than this give unreliable voice embeddings
+MIN_EMBED_SEGMENT_SEC = 1.5
+# Segments this many standard deviations below the mean similarity to the
+# first-pass centroid are treated as diarization mistakes and dropped
+OUTLIER_STD = 2.0
+
+def embed_segments(decoded_audio, segments: list[dict]) -> list[dict]:
+    """
+    Embed every segment of every speaker in one batched pass. Sets
+    seg['embedding'] (np.ndarray) on segments long enough to embed and
+    returns those segments.
+    """
+    embeddable = [seg for seg in segments if seg['duration_sec'] >= MIN_EMBED_SEGMENT_SEC]
+    if not embeddable:
+        return []
+    utterances = [decoded_audio.slice_samples(seg['start_time'], seg['end_time']) for seg in embeddable]
+    for seg, embedding in zip(embeddable, get_embedding_service().embed_many(utterances)):
+        seg['embedding'] = embedding
+    return embeddable
+
+def speaker_centroid(embeddings: np.ndarray, durations: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Duration-weighted mean embedding with outlier rejection.
+    Returns (normalized centroid, boolean mask of the embeddings kept).
+    """
+    def weighted_centroid(mask):
+        centroid = (embeddings[mask] * durations[mask, None]).sum(axis=0)
+        return centroid / np.linalg.norm(centroid)
+
+    keep = np.ones(len(embeddings), dtype=bool)
+    centroid = weighted_centroid(keep)
+    if len(embeddings) >= 3:
+        similarities = embeddings @ centroid
+        keep = similarities >= similarities.mean() - OUTLIER_STD * similarities.std()
+        centroid = weighted_centroid(keep)
+    return centroid, keep
+
+def embed_speakers(decoded_audio, segments: list[dict]) -> dict[str, dict]:
+    """
+    Embed all segments and aggregate a centroid per speaker.
+    Returns speaker_id -> {"centroid", "segments", "rejected", "duration_sec"}.
+    """
+    by_speaker = {}
+    for seg in embed_segments(decoded_audio, segments):
+        by_speaker.setdefault(seg['speaker_id'], []).append(seg)
+
+    speakers = {}
+    for speaker_id, speaker_segments in by_speaker.items():
+        embeddings = np.stack([seg['embedding'] for seg in speaker_segments])
+        durations = np.array([seg['duration_sec'] for seg in speaker_segments], dtype=np.float32)
+        centroid, keep = speaker_centroid(embeddings, durations)
+        speakers[speaker_id] = {
+            "centroid": centroid,
+            "segments": int(keep.sum()),
+            "rejected": int((~keep).sum()),
+            "duration_sec": float(durations[keep].sum()),
+        }
+    return speakers
+
 def save_embedding(embedding: np.ndarray, output_path: str):
     np.save(output_path, embedding)
     print(f"Embedding saved to {output_path}")
@@ -0,0 +1,221 @@
+import correspondents_datasource
+import audio_scraper
+import crawler
+import main
+import multiprocessing
+import numpy as np
+import argparse
+import hashlib
+import json
+import os
+import socket
+import time
+
+ARTIFACT_DIR = os.getenv("JOB_ARTIFACT_DIR", "job_artifacts")
+# A running job whose worker has not checkpointed for this long is reclaimed
+LEASE_SEC = int(os.getenv("JOB_LEASE_SEC", 30 * 60))
+MAX_ATTEMPTS = 3
+POLL_SEC = 10
+
+# Stages in order; a job's stage column holds the last one completed.
+# Storing (rows, uploads and URLs) is a single transaction, so it is one stage.
+QUEUED, DIARIZED, LABELLED, DONE = "queued", "diarized", "labelled", "done"
+STAGES = [QUEUED, DIARIZED, LABELLED, DONE]
+
+
+def artifact_dir(audio_url: str) -> str:
+    path = os.path.join(ARTIFACT_DIR, hashlib.sha256(audio_url.encode()).hexdigest()[:24])
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def save_diarization(job: dict, path: str) -> dict:
+    """Write segments (JSON) and segment/centroid embeddings (.npy) to path. Returns their artifact paths."""
+    segments, speakers = job['segments'], job['speakers']
+    embeddings = np.full((len(segments), 256), np.nan, dtype=np.float32)
+    for row, seg in enumerate(segments):
+        if 'embedding' in seg:
+            embeddings[row] = seg['embedding']
+    speaker_ids = list(speakers)
+
+    artifacts = {
+        "segments": os.path.join(path, "segments.json"),
+        "segment_embeddings": os.path.join(path, "segment_embeddings.npy"),
+        "speakers": os.path.join(path, "speakers.json"),
+        "centroids": os.path.join(path, "centroids.npy"),
+    }
+    with open(artifacts["segments"], "w") as f:
+        json.dump([{key: value for key, value in seg.items() if key != 'embedding'} for seg in segments], f)
+    np.save(artifacts["segment_embeddings"], embeddings)
+    with open(artifacts["speakers"], "w") as f:
+        json.dump({speaker_id: {key: value for key, value in speakers[speaker_id].items() if key != 'centroid'} for speaker_id in speaker_ids}, f)
+    np.save(artifacts["centroids"], np.stack([speakers[speaker_id]['centroid'] for speaker_id in speaker_ids]) if speaker_ids else np.empty((0, 256), dtype=np.float32))
+    return artifacts
+
+def load_diarization(job: dict, artifacts: dict) -> bool:
+    """Restore segments and speakers from cached artifacts. Returns False if any file is missing (e.g. on another host)."""
+    paths = [artifacts.get(key) for key in ("segments", "segment_embeddings", "speakers", "centroids")]
+    if not all(path and os.path.exists(path) for path in paths):
+        return False
+    with open(artifacts["segments"]) as f:
+        segments = json.load(f)
+    for seg, embedding in zip(segments, np.load(artifacts["segment_embeddings"])):
+        if not np.isnan(embedding).any():
+            seg['embedding'] = embedding
+    with open(artifacts["speakers"]) as f:
+        speakers = json.load(f)
+    for speaker, centroid in zip(speakers.values(), np.load(artifacts["centroids"])):
+        speaker['centroid'] = centroid
+    job['segments'], job['speakers'] = segments, speakers
+    return True
+
+def store_once(job: dict):
+    """
+    Store the story unless an earlier attempt already committed it (it may
+    have died before checkpointing). The audio row, segments and URLs are
+    committed together, so an existing audio row means the story is complete.
+    """
+    existing = correspondents_datasource.get_audio_by_url(job['story']['audio_url'])
+    if existing:
+        print(f"Audio {existing[0]} was stored by an earlier attempt; skipping")
+        return job
+    if 'decoded_audio' not in job:
+        main.download_story(job)
+    main.clip_story(job)
+    return main.store_story(job)
+
+def _selection_artifacts(job: dict) -> dict:
+    """The labelled selection, small enough to live in the job row so any host can resume from it."""
+    return {
+        "selected_segments": [
+            {**{key: value for key, value in seg.items() if key != 'embedding'},
+             "embedding": seg['embedding'].tolist() if 'embedding' in seg else None}
+            for seg in job['selected_segments']
+        ],
+        "embedding": list(job['embedding']),
+        "correspondent_name": job['story']['correspondent_name'],
+        "correspondent_gender": job['story']['correspondent_gender'],
+    }
+
+def _load_selection(job: dict, artifacts: dict):
+    job['selected_segments'] = [
+        {**seg, "embedding": np.asarray(seg['embedding'], dtype=np.float32)} if seg.get('embedding') is not None
+        else {key: value for key, value in seg.items() if key != 'embedding'}
+        for seg in artifacts["selected_segments"]
+    ]
+    job['embedding'] = artifacts["embedding"]
+    job['story']['correspondent_name'] = artifacts["correspondent_name"]
+    job['story']['correspondent_gender'] = artifacts["correspondent_gender"]
+
+def run_job(job_id: int, story: dict, stage: str, artifacts: dict) -> str:
+    """
+    Run a story from the stage after its last checkpoint. Each completed
+    stage is checkpointed, so a retry (here or on another worker) skips it.
+    Diarization output is cached as files on this host; everything later
+    stages need is kept in the job row. Returns the final status: done or review.
+    """
+    job = {'story': story}
+    done = STAGES.index(stage)
+
+    def checkpoint(new_stage, **new_artifacts):
+        artifacts.update(new_artifacts)
+        correspondents_datasource.checkpoint_story_job(job_id, new_stage, artifacts)
+        print(f"Job {job_id}: {new_stage}")
+
+    try:
+        if done < STAGES.index(LABELLED):
+            if done < STAGES.index(DIARIZED) or not load_diarization(job, artifacts):
+                main.download_story(job)
+                main.diarize_story(job)
+                checkpoint(DIARIZED, **save_diarization(job, artifact_dir(story['audio_url'])))
+            if not main.label_story(job):
+                return "review"
+            checkpoint(LABELLED, **_selection_artifacts(job))
+        else:
+            _load_selection(job, artifacts)
+
+        # Clips are temporary and cut from the (cached) download on every attempt
+        store_once(job)
+        checkpoint(DONE)
+        return "done"
+    finally:
+        main.cleanup_story(job)
+
+def work(max_jobs: int = None, exit_when_empty: bool = False, lease_sec: int = LEASE_SEC):
+    """Claim and run jobs until the queue is empty (with exit_when_empty) or max_jobs have run."""
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    completed = 0
+    while max_jobs is None or completed < max_jobs:
+        claimed = correspondents_datasource.claim_story_job(worker, lease_sec)
+        if not claimed:
+            if exit_when_empty:
+                break
+            time.sleep(POLL_SEC)
+            continue
+
+        job_id, story, stage, artifacts, attempts = claimed
+        print(f"\n[{worker}] Job {job_id} (attempt {attempts}, from stage {stage}): {story['audio_url']}")
+        try:
+            status = run_job(job_id, story, stage, artifacts)
+            correspondents_datasource.finish_story_job(job_id, status)
+        except Exception as e:
+            status = "failed" if attempts >= MAX_ATTEMPTS else "pending"
+            print(f"❌ Error in job {job_id}, marking {status}: {e}")
+            correspondents_datasource.finish_story_job(job_id, status, str(e))
+        completed += 1
+    print(f"[{worker}] Processed {completed} job(s)")
+    if completed:
+        correspondents_datasource.refresh_quiz_sampling()
+
+def work_in_processes(processes: int, max_jobs: int = None, exit_when_empty: bool = False):
+    """Run workers in separate processes; each gets its own DB pool and models."""
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=work, args=(max_jobs, exit_when_empty)) for _ in range(processes)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = subparsers.add_parser("enqueue", help="Queue stories for processing")
+    enqueue.add_argument("--url", help="Rundown url to pull stories from")
+    enqueue.add_argument("--date", help="Queue ATC|ME stories for a date in YYYY-MM-DD format")
+    enqueue.add_argument("--from", dest="from_date", help="First date of a crawl in YYYY-MM-DD format (requires --to)")
+    enqueue.add_argument("--to", dest="to_date", help="Last date of a crawl in YYYY-MM-DD format")
+    enqueue.add_argument("--frontier", default=crawler.DEFAULT_FRONTIER_PATH, help="SQLite crawl frontier used by --from/--to")
+
+    worker = subparsers.add_parser("work", help="Drain the queue; safe to run on many hosts at once")
+    worker.add_argument("--processes", type=int, default=1, help="Worker processes on this host")
+    worker.add_argument("--max_jobs", type=int, help="Stop each worker after this many jobs")
+    worker.add_argument("--exit_when_empty", action="store_true", help="Stop instead of polling when the queue is empty")
+
+    requeue = subparsers.add_parser("requeue", help="Return failed (or review) jobs to the queue, keeping their checkpoints")
+    requeue.add_argument("--status", nargs="+", default=["failed"], help="Statuses to requeue")
+
+    subparsers.add_parser("status", help="Show job counts per status")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        if args.url:
+            correspondents_datasource.enqueue_story_jobs(audio_scraper.scrape_stories(args.url))
+        elif args.date:
+            urls = list(audio_scraper.program_urls(args.date).values())
+            scraped = audio_scraper.scrape_many(urls)
+            correspondents_datasource.enqueue_story_jobs([story for url in urls for story in scraped[url]])
+        elif args.from_date and args.to_date:
+            # One transaction per page; crawl_pages marks a page done only after its enqueue commits
+            for _, stories in crawler.crawl_pages(args.from_date, args.to_date, crawler.CrawlFrontier(args.frontier)):
+                correspondents_datasource.enqueue_story_jobs(stories)
+        else:
+            parser.error("enqueue needs --url, --date or --from/--to")
+    elif args.command == "work":
+        if args.processes > 1:
+            work_in_processes(args.processes, args.max_jobs, args.exit_when_empty)
+        else:
+            work(args.max_jobs, args.exit_when_empty)
+    elif args.command == "requeue":
+        print(f"Requeued {correspondents_datasource.requeue_story_jobs(tuple(args.status))} job(s)")
+    elif args.command == "status":
+        print(json.dumps(correspondents_datasource.get_story_job_counts(), indent=2))
@@ -6,102 +6,245 @@ import correspondents_datasource
 import os
 import json
 import audio_storage
+import crawler
+import auto_label
+import speaker_index
+import pipeline
+import psycopg2.errors
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from diarize_audio import download_audio
-from audio_editor import extract_segment, convert_type
+from audio_editor import extract_segments, DecodedAudio
 
 BASE_API_PATH = "/api/audio"
 MIN_SIMILARITY_THRESHOLD = 0.80
 GCS_BUCKET_NAME = "npr_audio_quiz"
 DEFAULT_AUDIO_TYPE = "mp3"
-# 
-WORKING_DIR = "downloads"
-def process_story(story, db_url):
+CLIP_WORKERS = int(os.getenv("CLIP_WORKERS", os.cpu_count() or 1))
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", 4))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 2))
+STORE_WORKERS = int(os.getenv("STORE_WORKERS", 4))
+
+def process_story(story, db_url, auto=False):
+    """
+    Diarize, embed, clip and persist one story. With auto, the target
+    speaker and segments are chosen without prompting; stories the
+    auto-labeller is unsure about are written to the review queue instead.
+    Stories whose audio is already stored are skipped.
+    """
+    if not is_new_story({'story': story}):
+        return
 
-    if 'correspondents' in story:
+    if 'correspondents' in story and not auto:
         story['correspondent_name'] = input(f"Select the target correspondent name or type the name: {story['correspondents']}: ").strip()
 
         if story['correspondent_name'] == "":
             return
 
     print("\n======================")
-    print(f"Processing story for correspondent: {story['correspondent_name']}")
-    selected_segments = []
+    print(f"Processing story for correspondent: {story.get('correspondent_name') or story.get('correspondents')}")
+    job = {'story': story}
     try:
-        audio_url = story['audio_url']
-        # Determine expected wav path
-        # TODO clean this shit up
-        # parsed = os.path.splitext(os.path.basename(audio_url))
-        # audio_filename = parsed[0] + ".mp3"
-        audio_filename = os.path.basename(audio_url)
-        mp3_audio_path = os.path.join(WORKING_DIR, audio_filename) #downloads/filename.mp3
-        if not os.path.exists(mp3_audio_path):
-            mp3_audio_path = download_audio(audio_url)
-        
-        wav_audio_path = convert_type(mp3_audio_path, "wav")
-
-        # diarize audio
-        segments = diarize_audio.diarize_audio(wav_audio_path)
-        speaker_ids: set[int] = set()
-        for seg in segments:
-            speaker_ids.add(seg['speaker_id'])
-            print(f"Id: {seg['segment_id']}, Speaker: {seg['speaker_id']}, Start: {seg['start_time']:.1f}s, End: {seg['end_time']:.1f}s, Duration: {seg['duration_sec']:.1f}s")
-
-        speaker_id = input(f"\nEnter the speaker ID to filter segments, or press Enter to skip {list(speaker_ids)}: ").strip()
-
-        if speaker_id not in speaker_ids:
-            return
+        download_story(job)
+        diarize_story(job)
 
-        filtered_segments = get_filtered_segments(segments, speaker_id)
+        if auto:
+            selection = select_segments_automatically(story, job['segments'], job['speakers'])
+        else:
+            selection = select_segments_interactively(story, job['segments'], job['speakers'], job['decoded_audio'])
+        if not selection:
+            return
+        job['selected_segments'], job['embedding'] = selection
 
-        segment_ids = sorted(set(map(lambda x: int(x['segment_id']), filtered_segments)))
+        clip_story(job)
+        store_story(job)
+    finally:
+        cleanup_story(job)
 
-        segment_to_embed_id = input(f"Enter the segment ID to use for embedding {segment_ids}: ").strip()
+        print(f"Completed for correspondent: {story.get('correspondent_name') or story.get('correspondents')}")
+        print("\n======================")
 
-        segment_id_input = input(f"Enter the segment ids to be used for audio segments, or press Enter to use all of them {segment_ids}: ").strip()
-        if segment_id_input:
-            selected_segment_ids = set(segment_id_input.split(','))
-            selected_segments = [seg for seg in filtered_segments if str(seg['segment_id']) in selected_segment_ids]
-        else:
-            selected_segments = filtered_segments
+# Pipeline steps. Each takes and returns a job dict that starts as {'story': story}.
+
+def is_new_story(job):
+    """Drop stories whose audio was stored by an earlier run, before paying for download and diarization."""
+    existing = correspondents_datasource.get_audio_by_url(job['story']['audio_url'])
+    if existing:
+        print(f"Audio {existing[0]} already stored for {job['story']['audio_url']}; skipping")
+        return None
+    return job
+
+def download_story(job):
+    # The player URL carries size= for download validation; both share a cache entry
+    story = job['story']
+    mp3_audio_path = download_audio(story.get('source_audio_url') or story['audio_url'])
+
+    # decode once; diarization, embedding and clipping share the buffer
+    job['decoded_audio'] = DecodedAudio(mp3_audio_path)
+    return job
+
+def diarize_story(job):
+    segments = diarize_audio.diarize_audio(job['decoded_audio'])
+    for seg in segments:
+        print(f"Id: {seg['segment_id']}, Speaker: {seg['speaker_id']}, Start: {seg['start_time']:.1f}s, End: {seg['end_time']:.1f}s, Duration: {seg['duration_sec']:.1f}s")
+    job['segments'] = segments
+
+    # embed every diarized segment in one batch; each speaker gets a centroid voice print
+    job['speakers'] = generate_embedding.embed_speakers(job['decoded_audio'], segments)
+    return job
+
+def label_story(job):
+    selection = select_segments_automatically(job['story'], job['segments'], job['speakers'])
+    if not selection:
+        return None
+    job['selected_segments'], job['embedding'] = selection
+    return job
+
+def clip_story(job, executor=None):
+    # create audio segments in mp3
+    selected_segments = job['selected_segments']
+    clip_paths = extract_segments(job['decoded_audio'], [(seg['start_time'], seg['end_time']) for seg in selected_segments], "mp3", workers=CLIP_WORKERS, executor=executor)
+    for seg, clip_path in zip(selected_segments, clip_paths):
+        seg["mp3_audio_path"] = clip_path
+    # the clips are on disk; the decoded episode is no longer needed
+    del job['decoded_audio']
+    return job
+
+def store_story(job):
+    """
+    Insert the correspondent (if new), audio and segments, upload the clips
+    and record their URLs in one transaction. A failed upload or write
+    leaves neither rows nor uploaded clips behind.
+    """
+    story, selected_segments = job['story'], job['selected_segments']
+    segments = [
+        {
+            'start_time_sec': seg['start_time'],
+            'end_time_sec': seg['end_time'],
+            'embedding': seg['embedding'].tolist() if 'embedding' in seg else None
+        }
+        for seg in selected_segments
+    ]
+    audio_metadata, urls = None, []
+    try:
+        with correspondents_datasource.story_transaction() as uow:
+            #(correspondent_id, audio_id, segment_ids)
+            audio_metadata = uow.save_story(story['correspondent_name'], story['correspondent_gender'], job['embedding'], story['audio_url'], segments)
+            print(f"🎵 Saved audio {audio_metadata[1]} for correspondent {audio_metadata[0]} with segments {audio_metadata[2]}")
+            urls = audio_storage.save_segments(audio_metadata, zip(selected_segments, audio_metadata[2]))
+            uow.set_segment_urls(audio_metadata[1], urls)
+    except Exception:
+        # A failed save_segments deletes its own partial uploads; this covers failures after it
+        if urls:
+            audio_storage.delete_segments(audio_metadata, [segment_id for segment_id, _, _ in urls])
+        raise
+    job['audio_metadata'], job['urls'] = audio_metadata, urls
+    cleanup_story(job)
+    return job
+
+def cleanup_story(job):
+    # The downloaded episode stays in the download cache, which evicts by size
+    for seg in (job.get('selected_segments') or []):
+        cleanup_audio(seg.pop("mp3_audio_path", None))
+
+def process_stories_pipelined(stories, db_url, pages=None):
+    """
+    Process stories (auto-labelled) in overlapping stages so downloads,
+    diarization, clip encoding and uploads run at the same time. Bounded
+    queues between stages keep at most a few decoded episodes in memory.
+    With a crawler.PageTracker, each crawled page is marked done only once
+    all of its stories have left the pipeline without failing.
+    """
+    def mark_failed(job):
+        job['failed'] = True
+
+    def discard_story(job):
+        cleanup_story(job)
+        if pages:
+            pages.finish(job['story'], ok=not job.get('failed'))
+
+    # spawn, not fork: this process already runs pipeline threads and the models (as in jobs.py)
+    with ProcessPoolExecutor(max_workers=CLIP_WORKERS, mp_context=multiprocessing.get_context("spawn")) as clip_executor:
+        story_pipeline = pipeline.Pipeline([
+            pipeline.Stage("check", is_new_story, workers=1),
+            pipeline.Stage("download", download_story, workers=DOWNLOAD_WORKERS),
+            # single consumer: the diarization and embedding models own the GPU
+            pipeline.Stage("diarize", diarize_story, workers=1),
+            pipeline.Stage("label", label_story, workers=1),
+            pipeline.Stage("clip", partial(clip_story, executor=clip_executor), workers=2),
+            # each store holds one pooled connection (DB_POOL_MAX) for its transaction
+            pipeline.Stage("store", store_story, workers=STORE_WORKERS),
+        ], queue_size=PIPELINE_QUEUE_SIZE, on_discard=discard_story, on_error=mark_failed)
+
+        for job in story_pipeline.run({'story': story} for story in stories):
+            print(f"Completed for correspondent: {job['story']['correspondent_name']}")
+            if pages:
+                pages.finish(job['story'])
+    story_pipeline.print_report()
+    print(f"DB pool: {json.dumps(correspondents_datasource.get_pool_metrics())}")
+
+def select_segments_interactively(story, segments, speakers, decoded_audio):
+    """Prompt for the speaker, embedding segment, clip segments and gender. Returns (segments, embedding) or None."""
+    speaker_ids = {seg['speaker_id'] for seg in segments}
+    speaker_id = input(f"\nEnter the speaker ID to filter segments, or press Enter to skip {list(speaker_ids)}: ").strip()
+
+    if speaker_id not in speaker_ids:
+        return None
+
+    filtered_segments = get_filtered_segments(segments, speaker_id)
+
+    segment_ids = sorted(set(map(lambda x: int(x['segment_id']), filtered_segments)))
+
+    segment_to_embed_id = input(f"Enter the segment ID to use for embedding, or press Enter to use the speaker's centroid {segment_ids}: ").strip()
+
+    segment_id_input = input(f"Enter the segment ids to be used for audio segments, or press Enter to use all of them {segment_ids}: ").strip()
+    if segment_id_input:
+        selected_segment_ids = set(segment_id_input.split(','))
+        selected_segments = [seg for seg in filtered_segments if str(seg['segment_id']) in selected_segment_ids]
+    else:
+        selected_segments = filtered_segments
 
-        if not selected_segments:
-            print("No segments selected for audio segments.")
-            return
-        
+    if not selected_segments:
+        print("No segments selected for audio segments.")
+        return None
+    
+    if segment_to_embed_id:
         segment_for_embedding = next((seg for seg in selected_segments if str(seg['segment_id']) == segment_to_embed_id), None)
-        embedding = create_embedding(wav_audio_path, segment_for_embedding)
-
-        story['correspondent_gender'] = input(f"Enter gender of correspondent {story['correspondent_name']} (M/F/U): ").strip().upper()
-        
-        if not story['correspondent_gender']:
-            story['correspondent_gender'] = 'U'  # Default to unknown if not provided
-
-        # create audio segments in mp3
-        for seg in selected_segments:
-            # seg_filename = f'{story["correspondent_name"]}_{seg["segment_id"]}'
-            seg["mp3_audio_path"] = extract_segment(mp3_audio_path,  seg['start_time'], seg['end_time'], "mp3")
-            # print(seg["mp3_audio_path"])
-
-        #(correspondent_id, audio_id, segment_ids)
-        audio_metadata = handle_db_operations(db_url, story, embedding, selected_segments)
-        segments_with_id = zip(selected_segments, audio_metadata[2]) #(segment, segment_id) this is kinda sloppy
-
-        for seg in segments_with_id:
-            storage_url, public_url = audio_storage.save_segment(audio_metadata, seg)
-            correspondents_datasource.update_audio_segment_storage_url(audio_metadata[1], seg[1], storage_url) 
-            correspondents_datasource.update_audio_segment_public_url(seg[1], public_url)
-        
-    finally:
-        # Clean up the downloaded audio file if it was downloaded in this run
-        cleanup_audio(wav_audio_path)
-        cleanup_audio(mp3_audio_path)
-        
-        for seg in (selected_segments or []):
-            cleanup_audio(seg["mp3_audio_path"])
-
-        print(f"Completed for correspondent: {story['correspondent_name']}")
-        print("\n======================")
-        
+        embedding = create_embedding(decoded_audio, segment_for_embedding)
+    elif speaker_id in speakers:
+        speaker = speakers[speaker_id]
+        print(f"Using centroid of {speaker['segments']} segment(s) ({speaker['rejected']} rejected as outliers)")
+        embedding = speaker['centroid'].tolist()
+    else:
+        print("No embeddable segments for this speaker.")
+        return None
+
+    story['correspondent_gender'] = input(f"Enter gender of correspondent {story['correspondent_name']} (M/F/U): ").strip().upper()
+    
+    if not story['correspondent_gender']:
+        story['correspondent_gender'] = 'U'  # Default to unknown if not provided
+
+    return selected_segments, embedding
+
+def select_segments_automatically(story, segments, speakers):
+    """
+    Pick the speaker from byline names and voice similarity to known
+    correspondents. Low-confidence stories go to the review queue. Returns
+    (segments, embedding) or None.
+    """
+    decision = auto_label.label_story(story, speakers, speaker_index.get_speaker_index())
+    print(f"Auto-label: {decision}")
+    selected_segments = get_filtered_segments(segments, decision['speaker_id']) if decision['confident'] else []
+    if not selected_segments:
+        if decision['confident']:
+            decision['reason'] = "no segments over the minimum duration"
+        auto_label.queue_for_review(story, segments, speakers, decision)
+        return None
+
+    story['correspondent_name'] = decision['correspondent_name']
+    story['correspondent_gender'] = decision['gender']
+    return selected_segments, speakers[decision['speaker_id']]['centroid'].tolist()
 
 # def save_segments(db_url, audio_metadata, segments):
 #     audio_id = audio_metadata[1]
@@ -120,13 +263,15 @@ def cleanup_audio(audio_path):
             print(f"Failed to delete audio file {audio_path}: {e}")
 
 
-def create_embedding(wav_audio_path, segment_for_embedding):    
+def create_embedding(decoded_audio, segment_for_embedding):    
     if not segment_for_embedding:
         print("No segment found for embedding with the given segment_id.")
         return
+    if 'embedding' in segment_for_embedding:
+        return segment_for_embedding['embedding'].tolist()
     
-    segment_wav_path = extract_segment(wav_audio_path, segment_for_embedding['start_time'], segment_for_embedding['end_time'], "wav")
-    embedding = generate_embedding.generate_embedding(segment_wav_path)
+    samples = decoded_audio.slice_samples(segment_for_embedding['start_time'], segment_for_embedding['end_time'])
+    embedding = generate_embedding.generate_embedding(samples)
     return embedding
 
 
@@ -138,69 +283,18 @@ def print_long_segments(long_segments):
     for seg in long_segments:
         print(f"Start: {seg['start_time']:.1f}s, End: {seg['end_time']:.1f}s, Duration: {seg['duration_sec']:.1f}s")
 
-def handle_db_operations(db_url, story, embedding, segments):
-    # results = correspondents_datasource.get_embeddings_by_similarity(db_url, MIN_SIMILARITY_THRESHOLD, embedding)
-    correspondent_name = story['correspondent_name']
-    correspondent_audio_url = story['audio_url']
-    correspondent_gender = story['correspondent_gender']
-    result = correspondents_datasource.get_correspondent_by_name(correspondent_name)
-    if result:
-        print("Found embedding(s) with high similarity score.  Skipping creation of new correspondent...")
-        for row in result:
-            print(row)
-        correspondent_id = result[0]  # Assuming tuple (id, ...)
-        try:
-            audio_id = correspondents_datasource.create_audio(correspondent_id, correspondent_audio_url)
-            print(f"Created new audio record with id: {audio_id}")
-            audio_segments = [
-                {
-                    'audio_id': audio_id,
-                    'start_time_sec': seg['start_time'],
-                    'end_time_sec': seg['end_time']
-                }
-                for seg in segments
-            ]
-            segment_ids = correspondents_datasource.create_audio_segments(audio_segments)
-            print(f"Inserted audio segments with ids: {segment_ids}")
-        except Exception as e:
-            if 'duplicate key value violates unique constraint' in str(e):
-                print("Audio record already exists. Skipping audio and segment insertion.")
-            else:
-                print(f"Error inserting audio: {e}")
-                raise
+def process_stories(stories, db_url, args, pages=None):
+    if args.pipeline:
+        process_stories_pipelined(stories, db_url, pages)
     else:
-        print("No similarity results found. Creating new correspondent...")
-        correspondent_id = correspondents_datasource.create_correspondent_from_embedding(correspondent_name, correspondent_gender, embedding)
-        print(f"🗣️ Created new correspondent with id: {correspondent_id}")
-        audio_id = correspondents_datasource.create_audio(correspondent_id, correspondent_audio_url)
-        print(f"🎵 Created new audio record with id: {audio_id}")
-        audio_segments = [
-            {
-                'audio_id': audio_id,
-                'start_time_sec': seg['start_time'],
-                'end_time_sec': seg['end_time']
-            }
-            for seg in segments
-        ]
-        segment_ids = correspondents_datasource.create_audio_segments(audio_segments)
-        print(f"Inserted audio segments with ids: {segment_ids}")
-    return (correspondent_id, audio_id, segment_ids)
-
-# Create a map of month names with the key of number and value of month name
-month_map = {
-    '01': 'january',
-    '02': 'february',
-    '03': 'march',
-    '04': 'april',
-    '05': 'may',
-    '06': 'june',
-    '07': 'july',
-    '08': 'august',
-    '09': 'september',
-    '10': 'october',
-    '11': 'november',
-    '12': 'december'
-}
+        for story in stories:
+            try:
+                process_story(story, db_url, args.auto)
+            except psycopg2.errors.UniqueViolation:
+                # Stored by another run between the check and the insert
+                print(f"Audio already stored for {story['audio_url']}; skipping")
+    # New correspondents and clips reach quizzes once the sampling views are rebuilt
+    correspondents_datasource.refresh_quiz_sampling()
 
 def main():
     if not os.environ.get("CORRESPONDENTS_DB_CONN_URL"):
@@ -214,6 +308,11 @@ def main():
     parser.add_argument("--url", nargs="?", type=str, help="Url to pull all stories")
     parser.add_argument("--correspondent", "-c", nargs="?", type=str, help="End time in seconds")
     parser.add_argument("--date", nargs="?", type=str, help="Date in YYYY-MM-DD format")
+    parser.add_argument("--from", dest="from_date", nargs="?", type=str, help="First date of a crawl in YYYY-MM-DD format (requires --to)")
+    parser.add_argument("--to", dest="to_date", nargs="?", type=str, help="Last date of a crawl in YYYY-MM-DD format")
+    parser.add_argument("--frontier", nargs="?", type=str, help=f"SQLite crawl frontier used by --from/--to (default {crawler.DEFAULT_FRONTIER_PATH})")
+    parser.add_argument("--auto", action='store_true', help=f"Label stories without prompting; low-confidence stories go to {auto_label.REVIEW_QUEUE_PATH}")
+    parser.add_argument("--pipeline", action='store_true', help="Process --url/--date/--from stories in concurrent stages (implies --auto)")
     db_url = os.environ.get("CORRESPONDENTS_DB_CONN_URL")
     args = parser.parse_args()
 
@@ -223,38 +322,42 @@ def main():
         print("Add specific correspondent:  python -m audio_processor.main --add --audio_url <AUDIO_URL> --correspondent <NAME>")
         print("Process stories for specific url:  python -m audio_processor.main --url 2025-06-28")
         print("Process ATC|ME stories for a specific date:  python -m audio_processor.main --date 2025-06-28")
+        print("Crawl ATC|ME stories for a date range:  python -m audio_processor.main --from 2025-06-01 --to 2025-06-28")
+        print("Process ATC|ME stories for a date unattended:  python -m audio_processor.main --date 2025-06-28 --auto")
+        print("Crawl and process a date range in concurrent stages:  python -m audio_processor.main --from 2025-06-01 --to 2025-06-28 --pipeline")
         quit()
 
     if args.url:
         stories = audio_scraper.scrape_stories(args.url)
-        for story in stories:
-            process_story(story, db_url)
+        process_stories(stories, db_url, args)
 
     if args.add and args.audio_url and args.correspondent:
         process_story({
             'audio_url': args.audio_url,
             'correspondent_name': args.correspondent
-        }, db_url)    
+        }, db_url, args.auto)    
 
     if args.add and args.json:
         try:
             data = json.loads(args.json)
-            process_story(data, db_url)
+            process_story(data, db_url, args.auto)
         except json.JSONDecodeError:
             print(f"Error decoding JSON from file {args.json}.")
 
 
     elif args.date:
-        date_path = args.date.replace('-', '/')
-        date_with_month = f'{month_map[args.date[5:7]]}-{args.date[8:10]}-{args.date[:4]}'
-        me_site = f'https://www.npr.org/programs/morning-edition/{date_path}/morning-edition-for-{date_with_month}'
-        atc_site = f'https://www.npr.org/programs/all-things-considered/{date_path}/all-things-considered-for-{date_with_month}'
-        
-        me_stores = audio_scraper.scrape_stories(me_site)
-        atc_stories = audio_scraper.scrape_stories(atc_site)
-        stories = me_stores + atc_stories
-        for story in stories:
-            process_story(story, db_url)
+        urls = list(audio_scraper.program_urls(args.date).values())
+        scraped = audio_scraper.scrape_many(urls)
+        stories = [story for url in urls for story in scraped[url]]
+        process_stories(stories, db_url, args)
+
+    elif args.from_date and args.to_date:
+        # Stories stream in as pages finish; restarts skip pages already crawled
+        frontier = crawler.CrawlFrontier(args.frontier or crawler.DEFAULT_FRONTIER_PATH)
+        # The pipeline reads ahead of the stores, so pages are marked done as their stories are stored
+        pages = crawler.PageTracker(frontier) if args.pipeline else None
+        stories = crawler.crawl(args.from_date, args.to_date, frontier, tracker=pages)
+        process_stories(stories, db_url, args, pages)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,162 @@
+import argparse
+import struct
+
+# Frame-level MP3 cutting: clips are copied byte-for-byte from the source
+# frames instead of being decoded and re-encoded. Cuts snap to frame
+# boundaries (1152 samples, ~26ms at 44.1kHz for MPEG-1 Layer III).
+
+MPEG1, MPEG2, MPEG25 = 3, 2, 0
+
+BITRATES_KBPS = {
+    MPEG1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    MPEG2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+BITRATES_KBPS[MPEG25] = BITRATES_KBPS[MPEG2]
+
+SAMPLE_RATES = {
+    MPEG1: [44100, 48000, 32000],
+    MPEG2: [22050, 24000, 16000],
+    MPEG25: [11025, 12000, 8000],
+}
+
+LAYER3 = 1
+MONO = 3
+
+
+class Mp3FormatError(ValueError):
+    """Raised when a file cannot be cut without re-encoding."""
+
+
+def parse_header(data: bytes, offset: int):
+    """
+    Parse the 4-byte frame header at offset.
+    Returns a dict describing the frame, or None if there is no valid Layer III header there.
+    """
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+    header = struct.unpack(">I", data[offset:offset + 4])[0]
+    version = (header >> 19) & 0x3
+    layer = (header >> 17) & 0x3
+    bitrate_index = (header >> 12) & 0xF
+    sample_rate_index = (header >> 10) & 0x3
+    if version == 1 or layer != LAYER3 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrate = BITRATES_KBPS[version][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    padding = (header >> 9) & 0x1
+    samples_per_frame = 1152 if version == MPEG1 else 576
+    return {
+        "header": header,
+        "version": version,
+        "bitrate_index": bitrate_index,
+        "sample_rate": sample_rate,
+        "samples_per_frame": samples_per_frame,
+        "channel_mode": (header >> 6) & 0x3,
+        "protected": ((header >> 16) & 0x1) == 0,
+        "length": (samples_per_frame // 8) * bitrate // sample_rate + padding,
+    }
+
+def _side_info_size(frame: dict) -> int:
+    if frame["version"] == MPEG1:
+        return 17 if frame["channel_mode"] == MONO else 32
+    return 9 if frame["channel_mode"] == MONO else 17
+
+def _is_vbr_header_frame(data: bytes, offset: int, frame: dict) -> bool:
+    """True for a Xing/Info (LAME) or VBRI header frame, which carries no audio."""
+    tag_offset = offset + 4 + (2 if frame["protected"] else 0) + _side_info_size(frame)
+    if data[tag_offset:tag_offset + 4] in (b"Xing", b"Info"):
+        return True
+    return data[offset + 36:offset + 40] == b"VBRI"
+
+def _skip_id3v2(data: bytes) -> int:
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+def read_frames(data: bytes) -> list[tuple[int, dict]]:
+    """
+    Index the audio frames in an MP3 file.
+    Returns (offset, frame) pairs, skipping ID3 tags and any Xing/Info/VBRI header frame.
+    """
+    frames = []
+    in_sync = False
+    offset = _skip_id3v2(data)
+    while offset + 4 <= len(data):
+        frame = parse_header(data, offset)
+        if frame and offset + frame["length"] > len(data):
+            break
+        # While searching for sync, only trust a header if the next frame also lines up
+        if frame and (in_sync or offset + frame["length"] == len(data) or parse_header(data, offset + frame["length"])):
+            if frames or not _is_vbr_header_frame(data, offset, frame):
+                frames.append((offset, frame))
+            in_sync = True
+            offset += frame["length"]
+        else:
+            in_sync = False
+            offset += 1
+    if not frames:
+        raise Mp3FormatError("No MPEG Layer III frames found")
+    return frames
+
+def _xing_frame(template: dict, frame_count: int, byte_count: int, vbr: bool) -> bytes:
+    """
+    Build a Xing/Info header frame so players report the clip's duration
+    correctly. Returns b"" if no bitrate gives a frame large enough for it.
+    """
+    # Same stream parameters as the audio, no CRC, no padding
+    header = template["header"] | (1 << 16)
+    header &= ~(1 << 9)
+    tag_offset = 4 + _side_info_size(template)
+    needed = tag_offset + 16
+    # Low-bitrate MPEG-2/2.5 frames can be too small for the tag; use the smallest bitrate that fits
+    for bitrate_index in range(template["bitrate_index"], 15):
+        bitrate = BITRATES_KBPS[template["version"]][bitrate_index] * 1000
+        length = (template["samples_per_frame"] // 8) * bitrate // template["sample_rate"]
+        if length >= needed:
+            break
+    else:
+        return b""
+    header = (header & ~(0xF << 12)) | (bitrate_index << 12)
+    frame = bytearray(length)
+    frame[0:4] = struct.pack(">I", header)
+    frame[tag_offset:tag_offset + 16] = (b"Xing" if vbr else b"Info") + struct.pack(">III", 0x3, frame_count, byte_count + length)
+    return bytes(frame)
+
+def frame_range(frames: list[tuple[int, dict]], start_sec: float, end_sec: float) -> tuple[int, int]:
+    """Frame indexes covering [start_sec, end_sec], snapped outwards to frame boundaries."""
+    frame_sec = frames[0][1]["samples_per_frame"] / frames[0][1]["sample_rate"]
+    first = max(0, int(start_sec / frame_sec))
+    last = min(len(frames), -int(-end_sec // frame_sec))
+    if first >= last:
+        raise Mp3FormatError(f"Empty clip for range {start_sec}-{end_sec}s")
+    return first, last
+
+def write_clip(data: bytes, frames: list[tuple[int, dict]], start_sec: float, end_sec: float, out_path: str) -> str:
+    """Copy the frames covering [start_sec, end_sec] to out_path behind a fresh Xing/Info header."""
+    first, last = frame_range(frames, start_sec, end_sec)
+    clip_frames = frames[first:last]
+    start_offset = clip_frames[0][0]
+    end_offset = clip_frames[-1][0] + clip_frames[-1][1]["length"]
+    vbr = len({frame["bitrate_index"] for _, frame in clip_frames}) > 1
+    with open(out_path, "wb") as f:
+        f.write(_xing_frame(clip_frames[0][1], len(clip_frames), end_offset - start_offset, vbr))
+        f.write(data[start_offset:end_offset])
+    return out_path
+
+def cut_mp3(src_path: str, start_sec: float, end_sec: float, out_path: str) -> str:
+    """Cut [start_sec, end_sec] from an MP3 without re-encoding."""
+    with open(src_path, "rb") as f:
+        data = f.read()
+    return write_clip(data, read_frames(data), start_sec, end_sec, out_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("src", help="Source MP3 file")
+    parser.add_argument("--start", type=float, required=True, help="Start time in seconds")
+    parser.add_argument("--end", type=float, required=True, help="End time in seconds")
+    parser.add_argument("--out", required=True, help="Output MP3 file")
+    args = parser.parse_args()
+    print(cut_mp3(args.src, args.start, args.end, args.out))
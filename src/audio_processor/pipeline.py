@@ -0,0 +1,164 @@
+from dataclasses import dataclass, field
+import queue
+import threading
+import time
+
+DEFAULT_QUEUE_SIZE = 2
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """Per-stage counters. Times are in seconds."""
+    name: str
+    workers: int
+    items: int = 0
+    dropped: int = 0
+    errors: int = 0
+    busy_sec: float = 0.0
+    starved_sec: float = 0.0  # waiting on an empty input queue
+    blocked_sec: float = 0.0  # waiting on a full output queue (backpressure)
+    latencies: list = field(default_factory=list)
+
+    def summary(self, wall_sec: float) -> dict:
+        latencies = sorted(self.latencies)
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items": self.items,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "items_per_sec": round(self.items / wall_sec, 3) if wall_sec else 0.0,
+            "p50_sec": round(percentile(0.5), 3),
+            "p95_sec": round(percentile(0.95), 3),
+            "utilization": round(self.busy_sec / (wall_sec * self.workers), 3) if wall_sec else 0.0,
+            "starved_sec": round(self.starved_sec, 3),
+            "blocked_sec": round(self.blocked_sec, 3),
+        }
+
+class Stage:
+    """
+    One step of a Pipeline. fn takes an item and returns the item for the
+    next stage, or None to drop it. workers threads call fn concurrently;
+    use workers=1 for stages that must be single-consumer (e.g. the GPU).
+    """
+
+    def __init__(self, name: str, fn, workers: int = 1, queue_size: int = None):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+
+class Pipeline:
+    """
+    Runs items through stages connected by bounded queues, so a slow stage
+    blocks the ones upstream of it instead of letting work pile up in
+    memory, while every stage keeps working on a different item.
+
+    A failing item is reported and dropped; it does not stop the pipeline.
+    on_discard, if given, is called with every item a stage fails or drops
+    so it can release resources (e.g. temporary files). on_error, if given,
+    is called first with every item a stage fails.
+    """
+
+    def __init__(self, stages: list[Stage], queue_size: int = DEFAULT_QUEUE_SIZE, on_discard=None, on_error=None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_discard = on_discard
+        self.on_error = on_error
+        self.stats = [StageStats(stage.name, stage.workers) for stage in stages]
+        self.wall_sec = 0.0
+        self._lock = threading.Lock()
+
+    def run(self, items):
+        """Feed items (any iterable, consumed lazily) through the stages and yield the results."""
+        queues = [queue.Queue(maxsize=stage.queue_size or self.queue_size) for stage in self.stages]
+        output = queue.Queue(maxsize=self.queue_size)
+        queues.append(output)
+        remaining = [stage.workers for stage in self.stages]
+
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0]), name="pipeline-feed", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work, args=(index, queues[index], queues[index + 1], remaining),
+                    name=f"pipeline-{stage.name}-{worker}", daemon=True
+                ))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        while (item := output.get()) is not _DONE:
+            yield item
+        for thread in threads:
+            thread.join()
+        self.wall_sec = time.perf_counter() - start
+
+    def _feed(self, items, out_queue: queue.Queue):
+        try:
+            for item in items:
+                out_queue.put(item)
+        except Exception as e:
+            print(f"❌ Error reading pipeline input: {e}")
+        finally:
+            for _ in range(self.stages[0].workers):
+                out_queue.put(_DONE)
+
+    def _work(self, index: int, in_queue: queue.Queue, out_queue: queue.Queue, remaining: list[int]):
+        stage, stats = self.stages[index], self.stats[index]
+        while True:
+            wait_start = time.perf_counter()
+            item = in_queue.get()
+            started = time.perf_counter()
+            if item is _DONE:
+                break
+
+            try:
+                result = stage.fn(item)
+            except Exception as e:
+                print(f"❌ Error in pipeline stage {stage.name}: {e}")
+                result, failed = None, True
+            else:
+                failed = False
+            finished = time.perf_counter()
+
+            if result is not None:
+                out_queue.put(result)
+            blocked = time.perf_counter() - finished
+            if failed and self.on_error:
+                self.on_error(item)
+            if result is None and self.on_discard:
+                self.on_discard(item)
+            with self._lock:
+                stats.starved_sec += started - wait_start
+                stats.busy_sec += finished - started
+                stats.blocked_sec += blocked
+                stats.latencies.append(finished - started)
+                stats.items += 1
+                stats.errors += failed
+                stats.dropped += result is None and not failed
+
+        # The last worker out tells every worker of the next stage to stop
+        with self._lock:
+            remaining[index] -= 1
+            last = remaining[index] == 0
+        if last:
+            next_workers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+            for _ in range(next_workers):
+                out_queue.put(_DONE)
+
+    def report(self) -> list[dict]:
+        """Per-stage throughput, latency, utilization and queue wait times for the last run."""
+        return [stats.summary(self.wall_sec) for stats in self.stats]
+
+    def print_report(self):
+        print(f"\nPipeline finished in {self.wall_sec:.1f}s")
+        for row in self.report():
+            print(
+                f"  {row['stage']:<10} x{row['workers']}  {row['items']} item(s) ({row['dropped']} dropped, {row['errors']} failed)  "
+                f"{row['items_per_sec']}/s  p50 {row['p50_sec']}s  p95 {row['p95_sec']}s  "
+                f"busy {row['utilization']:.0%}  starved {row['starved_sec']}s  blocked {row['blocked_sec']}s"
+            )
@@ -0,0 +1,147 @@
+import correspondents_datasource
+import numpy as np
+import argparse
+import json
+import os
+
+DEFAULT_SNAPSHOT_DIR = "speaker_index"
+EMBEDDING_DIM = 256
+
+
+def normalize(embeddings) -> np.ndarray:
+    """Row-wise L2-normalized float32 copy of embeddings."""
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+class SpeakerIndex:
+    """
+    All correspondent embeddings as one normalized float32 matrix, so a
+    whole batch of segment embeddings is matched with a single matrix
+    multiply instead of one similarity query per embedding.
+
+    Snapshots are saved as a memory-mappable .npy (plus JSON metadata)
+    keyed by the correspondents table's version stamp.
+    """
+
+    def __init__(self):
+        self.version = "0-0"
+        self.ids = []
+        self.fullnames = []
+        self.genders = []
+        self.matrix = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR, subscribe: bool = True) -> "SpeakerIndex":
+        """
+        Load the snapshot matching the current DB version, or build one from
+        the DB. With subscribe, correspondents inserted through
+        correspondents_datasource are added to the index as they are created.
+        """
+        index = cls()
+        version = correspondents_datasource.get_correspondents_version()
+        matrix_path, metadata_path = _snapshot_paths(snapshot_dir, version)
+        if os.path.exists(matrix_path) and os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+            index.ids, index.fullnames, index.genders = metadata["ids"], metadata["fullnames"], metadata["genders"]
+            index.matrix = np.load(matrix_path, mmap_mode="r")
+            index.version = version
+            print(f"Loaded speaker index snapshot {version} ({len(index)} correspondents)")
+        else:
+            index.refresh()
+            index.version = version
+            index.save(snapshot_dir)
+
+        if subscribe:
+            correspondents_datasource.on_correspondent_created(index.add)
+        return index
+
+    def save(self, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR):
+        """Write the snapshot for the current version and remove older ones."""
+        os.makedirs(snapshot_dir, exist_ok=True)
+        matrix_path, metadata_path = _snapshot_paths(snapshot_dir, self.version)
+        np.save(matrix_path, np.ascontiguousarray(self.matrix))
+        with open(metadata_path, "w") as f:
+            json.dump({"version": self.version, "ids": self.ids, "fullnames": self.fullnames, "genders": self.genders}, f)
+        for name in os.listdir(snapshot_dir):
+            path = os.path.join(snapshot_dir, name)
+            if path not in (matrix_path, metadata_path) and name.startswith("correspondents-"):
+                os.remove(path)
+
+    def refresh(self) -> int:
+        """Pull correspondents added to the DB since the last load. Returns how many were added."""
+        after_id = max(self.ids, default=0)
+        rows = correspondents_datasource.get_correspondent_embeddings(after_id)
+        for correspondent_id, fullname, gender, _ in rows:
+            self._append(correspondent_id, fullname, gender)
+        if rows:
+            self.matrix = np.vstack([self.matrix, normalize([row[3] for row in rows])])
+        return len(rows)
+
+    def add(self, correspondent_id: int, fullname: str, gender: str, embedding):
+        """Add one correspondent, e.g. right after it was inserted."""
+        if correspondent_id in self.ids:
+            return
+        self._append(correspondent_id, fullname, gender)
+        self.matrix = np.vstack([self.matrix, normalize(embedding)])
+
+    def _append(self, correspondent_id, fullname, gender):
+        self.ids.append(correspondent_id)
+        self.fullnames.append(fullname)
+        self.genders.append(gender)
+        # Same stamp as get_correspondents_version() for a complete index
+        self.version = f"{len(self.ids)}-{max(self.ids)}"
+
+    def search(self, embeddings, k: int = 5, min_threshold: float = 0.0) -> list[list[tuple]]:
+        """
+        Top-k correspondents for each query embedding.
+        Returns, per query, (id, fullname, gender, similarity) tuples above
+        min_threshold, most similar first.
+        """
+        queries = normalize(embeddings)
+        # The matrix may trail ids while add() runs on another thread
+        k = min(k, self.matrix.shape[0])
+        if not k:
+            return [[] for _ in queries]
+        similarities = queries @ self.matrix.T
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-similarities[row, candidates])]
+            results.append([
+                (self.ids[i], self.fullnames[i], self.genders[i], float(similarities[row, i]))
+                for i in ordered
+                if similarities[row, i] > min_threshold
+            ])
+        return results
+
+def _snapshot_paths(snapshot_dir: str, version: str) -> tuple[str, str]:
+    base = os.path.join(snapshot_dir, f"correspondents-{version}")
+    return f"{base}.npy", f"{base}.json"
+
+_index = None
+
+def get_speaker_index() -> SpeakerIndex:
+    """Process-wide index, loaded on first use."""
+    global _index
+    if _index is None:
+        _index = SpeakerIndex.load()
+    return _index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embedding", nargs="+", required=True, help="Path(s) to .npy embedding files to identify")
+    parser.add_argument("--k", type=int, default=5, help="Matches per embedding")
+    parser.add_argument("--min_threshold", type=float, default=0.0, help="Minimum cosine similarity")
+    parser.add_argument("--snapshot_dir", default=DEFAULT_SNAPSHOT_DIR, help="Snapshot directory")
+    args = parser.parse_args()
+
+    index = SpeakerIndex.load(args.snapshot_dir, subscribe=False)
+    queries = [np.load(path) for path in args.embedding]
+    for path, matches in zip(args.embedding, index.search(queries, args.k, args.min_threshold)):
+        print(json.dumps({"embedding": path, "matches": matches}))
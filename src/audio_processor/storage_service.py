@@ -1,57 +1,281 @@
-from google.cloud import storage
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 import os
+import shutil
+import tempfile
+import threading
+
+# Which backend the module-level functions use: gcs, local or memory
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs")
+
+# Upload/download chunk size in bytes (rounded to GCS's 256 KiB multiple).
+# Unset lets the client pick: single-request below 8 MiB, resumable above.
+CHUNK_SIZE = int(os.getenv("GCS_CHUNK_SIZE", 0)) or None
+MAX_WORKERS = int(os.getenv("STORAGE_WORKERS", 8))
+
+# Points the client at a fake GCS server (e.g. fsouza/fake-gcs-server) for local runs
+EMULATOR_HOST = os.getenv("STORAGE_EMULATOR_HOST")
+
+# Local backend: files live under LOCAL_STORAGE_ROOT/<bucket>/<path>. Public URLs
+# use LOCAL_STORAGE_PUBLIC_URL/<bucket>/<path> when set (e.g. a static file server).
+LOCAL_STORAGE_ROOT = os.getenv("LOCAL_STORAGE_ROOT", "storage")
+LOCAL_STORAGE_PUBLIC_URL = os.getenv("LOCAL_STORAGE_PUBLIC_URL")
+
+_CHUNK_MULTIPLE = 256 * 1024
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    The process-wide storage client, created on first use. A forked child
+    gets its own client rather than sharing the parent's connections.
+    """
+    # Only the GCS backend needs google-cloud-storage
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud import storage
+
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            if EMULATOR_HOST:
+                _client = storage.Client(project="local", credentials=AnonymousCredentials())
+            else:
+                _client = storage.Client()
+            _client_pid = os.getpid()
+        return _client
+
+class StorageBackend(ABC):
+    """
+    Blob storage addressed by bucket and path. Subclasses implement get,
+    save and delete; the *_many variants run them on a thread pool.
+    """
+
+    @abstractmethod
+    def get(self, bucket_name: str, blob_path: str) -> bytes:
+        """Contents of a blob. Raises FileNotFoundError if it does not exist."""
+
+    @abstractmethod
+    def save(self, file_path: str, bucket_name: str, destination_blob_name: str) -> tuple:
+        """Store a local file. Returns (storage_url, public_url)."""
+
+    @abstractmethod
+    def delete(self, bucket_name: str, blob_name: str) -> bool:
+        """Returns True if the blob was deleted, False otherwise."""
+
+    def save_many(self, files: list[tuple[str, str]], bucket_name: str, workers: int = MAX_WORKERS) -> list[tuple]:
+        """
+        Store (file_path, destination_blob_name) pairs concurrently.
+        Returns (storage_url, public_url) per file, in order. If any save
+        fails, the files that were stored are deleted and the first error
+        is raised, so a failed batch leaves nothing behind.
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.save, file_path, bucket_name, blob_name) for file_path, blob_name in files]
+        errors = [future.exception() for future in futures if future.exception()]
+        if errors:
+            saved = [blob_name for (_, blob_name), future in zip(files, futures) if not future.exception()]
+            if saved:
+                self.delete_many(bucket_name, saved, workers)
+            raise errors[0]
+        return [future.result() for future in futures]
+
+    def get_many(self, bucket_name: str, blob_paths: list[str], workers: int = MAX_WORKERS) -> dict[str, bytes]:
+        """Fetch blobs concurrently. Returns blob_path -> bytes; missing blobs are reported and left out."""
+        def get_one(blob_path):
+            try:
+                return self.get(bucket_name, blob_path)
+            except FileNotFoundError as e:
+                print(f"❌ {e}")
+                return None
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            contents = dict(zip(blob_paths, executor.map(get_one, blob_paths)))
+        return {blob_path: data for blob_path, data in contents.items() if data is not None}
+
+    def delete_many(self, bucket_name: str, blob_names: list[str], workers: int = MAX_WORKERS) -> dict[str, bool]:
+        """Delete blobs concurrently. Returns blob_name -> whether it was deleted."""
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(blob_names, executor.map(lambda blob_name: self.delete(bucket_name, blob_name), blob_names)))
+
+class GCSBackend(StorageBackend):
+    """Google Cloud Storage over the process-wide client."""
+
+    def _blob(self, bucket_name: str, blob_path: str):
+        chunk_size = -(-CHUNK_SIZE // _CHUNK_MULTIPLE) * _CHUNK_MULTIPLE if CHUNK_SIZE else None
+        return get_client().bucket(bucket_name).blob(blob_path, chunk_size=chunk_size)
+
+    def get(self, bucket_name: str, blob_path: str) -> bytes:
+        from google.api_core.exceptions import NotFound
+        try:
+            return self._blob(bucket_name, blob_path).download_as_bytes()
+        except NotFound:
+            raise FileNotFoundError(f"File {blob_path} not found in bucket {bucket_name}")
+
+    def save(self, file_path: str, bucket_name: str, destination_blob_name: str) -> tuple:
+        blob = self._blob(bucket_name, destination_blob_name)
+        blob.upload_from_filename(file_path)
+        print(f"Uploaded {file_path} to gs://{bucket_name}/{destination_blob_name}")
+        return f"gs://{bucket_name}/{destination_blob_name}", blob.public_url
+
+    def delete(self, bucket_name: str, blob_name: str) -> bool:
+        blob = self._blob(bucket_name, blob_name)
+        try:
+            blob.delete()
+            print(f"Deleted gs://{bucket_name}/{blob_name}")
+            return True
+        except Exception as e:
+            print(f"Failed to delete gs://{bucket_name}/{blob_name}: {e}")
+            return False
+
+class LocalBackend(StorageBackend):
+    """
+    Files under root/<bucket>/<path>. Saves hard-link the source when it is
+    on the same filesystem (no copy) and always land via an atomic rename,
+    so readers never see a partial file.
+    """
+
+    def __init__(self, root: str = LOCAL_STORAGE_ROOT, public_url: str = LOCAL_STORAGE_PUBLIC_URL):
+        self.root = os.path.abspath(root)
+        self.public_url = public_url.rstrip("/") if public_url else None
+
+    def _path(self, bucket_name: str, blob_path: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, bucket_name, blob_path.lstrip("/")))
+        if not path.startswith(os.path.join(self.root, bucket_name) + os.sep):
+            raise ValueError(f"Blob path {blob_path} escapes bucket {bucket_name}")
+        return path
+
+    def get(self, bucket_name: str, blob_path: str) -> bytes:
+        try:
+            with open(self._path(bucket_name, blob_path), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File {blob_path} not found in bucket {bucket_name}")
+
+    def save(self, file_path: str, bucket_name: str, destination_blob_name: str) -> tuple:
+        path = self._path(bucket_name, destination_blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        os.close(fd)
+        try:
+            try:
+                os.remove(tmp_path)
+                os.link(file_path, tmp_path)
+            except OSError:
+                # Different filesystem (or no hard links): copy instead
+                shutil.copyfile(file_path, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        print(f"Stored {file_path} at {path}")
+        public_url = f"{self.public_url}/{bucket_name}/{destination_blob_name}" if self.public_url else f"file://{path}"
+        return f"file://{path}", public_url
+
+    def delete(self, bucket_name: str, blob_name: str) -> bool:
+        try:
+            os.remove(self._path(bucket_name, blob_name))
+            print(f"Deleted {bucket_name}/{blob_name}")
+            return True
+        except OSError as e:
+            print(f"Failed to delete {bucket_name}/{blob_name}: {e}")
+            return False
+
+class MemoryBackend(StorageBackend):
+    """Blobs in a dict; for tests, benchmarks and dry runs. Contents last as long as the process."""
+
+    def __init__(self):
+        self.blobs = {}
+        self._lock = threading.Lock()
+
+    def get(self, bucket_name: str, blob_path: str) -> bytes:
+        with self._lock:
+            data = self.blobs.get((bucket_name, blob_path))
+        if data is None:
+            raise FileNotFoundError(f"File {blob_path} not found in bucket {bucket_name}")
+        return data
+
+    def save(self, file_path: str, bucket_name: str, destination_blob_name: str) -> tuple:
+        with open(file_path, "rb") as f:
+            data = f.read()
+        with self._lock:
+            self.blobs[(bucket_name, destination_blob_name)] = data
+        url = f"memory://{bucket_name}/{destination_blob_name}"
+        return url, url
+
+    def delete(self, bucket_name: str, blob_name: str) -> bool:
+        with self._lock:
+            return self.blobs.pop((bucket_name, blob_name), None) is not None
+
+BACKENDS = {
+    "gcs": GCSBackend,
+    "local": LocalBackend,
+    "memory": MemoryBackend,
+}
+
+_backend = None
+_backend_pid = None
+
+def get_backend() -> StorageBackend:
+    """The process-wide backend named by STORAGE_BACKEND, created on first use."""
+    global _backend, _backend_pid
+    with _client_lock:
+        if _backend is None or _backend_pid != os.getpid():
+            if STORAGE_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}', expected one of {list(BACKENDS)}")
+            _backend = BACKENDS[STORAGE_BACKEND]()
+            _backend_pid = os.getpid()
+        return _backend
+
+def set_backend(backend: StorageBackend):
+    """Use backend for the rest of this process, e.g. a MemoryBackend in a benchmark."""
+    global _backend, _backend_pid
+    with _client_lock:
+        _backend, _backend_pid = backend, os.getpid()
 
 def get(bucket_name: str, blob_path: str) -> bytes:
     """
-    Download a file from Google Cloud Storage.
+    Download a file from storage.
     Args:
-        bucket_name: Name of the GCS bucket.
+        bucket_name: Name of the bucket.
         file_path: Path to the file in the bucket.
     Returns:
         The file contents as bytes.
     Raises:
         FileNotFoundError if the file does not exist.
     """
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(blob_path)
-    if not blob.exists():
-        raise FileNotFoundError(f"File {blob_path} not found in bucket {bucket_name}")
-    return blob.download_as_bytes()
+    return get_backend().get(bucket_name, blob_path)
 
 def save(file_path: str, bucket_name: str, destination_blob_name: str) -> tuple:
     """
-    Uploads a file to the specified Google Cloud Storage bucket.
+    Uploads a file to the specified bucket.
     Args:
         file_path: Local path to the file to upload.
-        bucket_name: Name of the GCS bucket.
+        bucket_name: Name of the bucket.
         destination_blob_name: Path in the bucket to store the file.
     Returns:
-        The public URL of the uploaded file.
+        The storage URL and public URL of the uploaded file.
     """
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(destination_blob_name)
-    blob.upload_from_filename(file_path)
-    print(f"Uploaded {file_path} to gs://{bucket_name}/{destination_blob_name}")
-    return f"gs://{bucket_name}/{destination_blob_name}", blob.public_url
+    return get_backend().save(file_path, bucket_name, destination_blob_name)
 
 def delete(bucket_name: str, blob_name: str) -> bool:
     """
-    Deletes a file from the specified Google Cloud Storage bucket.
+    Deletes a file from the specified bucket.
     Args:
-        bucket_name: Name of the GCS bucket.
+        bucket_name: Name of the bucket.
         blob_name: Path in the bucket to the file to delete.
     Returns:
         True if the file was deleted, False otherwise.
     """
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(blob_name)
-    try:
-        blob.delete()
-        print(f"Deleted gs://{bucket_name}/{blob_name}")
-        return True
-    except Exception as e:
-        print(f"Failed to delete gs://{bucket_name}/{blob_name}: {e}")
-        return False
\ No newline at end of file
+    return get_backend().delete(bucket_name, blob_name)
+
+def save_many(files: list[tuple[str, str]], bucket_name: str, workers: int = MAX_WORKERS) -> list[tuple]:
+    return get_backend().save_many(files, bucket_name, workers)
+
+def get_many(bucket_name: str, blob_paths: list[str], workers: int = MAX_WORKERS) -> dict[str, bytes]:
+    return get_backend().get_many(bucket_name, blob_paths, workers)
+
+def delete_many(bucket_name: str, blob_names: list[str], workers: int = MAX_WORKERS) -> dict[str, bool]:
+    return get_backend().delete_many(bucket_name, blob_names, workers)
@@ -1,21 +1,30 @@
-with random_correspondents AS (
-  SELECT id AS correspondent_id
-  FROM correspondents
+-- Samples the quiz_correspondents / quiz_genders materialized views
+-- (migrations/004_quiz_sampling.sql); refresh them with SELECT refresh_quiz_sampling()
+with roster AS (
+  SELECT coalesce(max(rn), 0) AS size FROM quiz_correspondents
+),
+picks AS (
+  -- 10 distinct ranks: every rank of a small roster, shuffled, otherwise
+  -- oversampled random ranks so duplicates still leave enough
+  SELECT rn FROM (
+    SELECT generate_series(1, CASE WHEN size <= 10 * 8 THEN size ELSE 0 END) AS rn
+    FROM roster
+    UNION
+    SELECT 1 + floor(random() * size)::int
+    FROM roster, generate_series(1, CASE WHEN size > 10 * 8 THEN 10 * 3 ELSE 0 END)
+  ) ranks
   ORDER BY random()
   LIMIT 10
 ),
 random_segments AS (
-  SELECT DISTINCT ON (corr.id)
-    corr.id AS correct_correspondent_id,
-    corr.fullname AS correct_correspondent_name,
-	corr.gender AS correct_correspondent_gender,
-    asegs.public_url AS audio_url
+  SELECT
+    qc.id AS correct_correspondent_id,
+    qc.fullname AS correct_correspondent_name,
+	qc.gender AS correct_correspondent_gender,
+    qc.segment_urls[1 + floor(random() * cardinality(qc.segment_urls))::int] AS audio_url
   FROM 
-    random_correspondents rc
-    JOIN correspondents corr ON corr.id = rc.correspondent_id
-    JOIN audio ON audio.correspondent_id = corr.id
-    JOIN audio_segments asegs ON audio.id = asegs.audio_id
-  ORDER BY corr.id, random()
+    picks
+    JOIN quiz_correspondents qc ON qc.rn = picks.rn
 ),
 question_with_options AS (
   SELECT 
@@ -23,14 +32,21 @@ question_with_options AS (
     rs.correct_correspondent_name correspondent_name,
     rs.audio_url,
     (
-      SELECT json_agg(json_build_object('id', id, 'full_name', fullname, 'is_answer', isanswer))
+      SELECT json_agg(json_build_object('id', id, 'full_name', fullname, 'is_answer', isanswer) ORDER BY random())
       FROM (
         SELECT id, fullname, isanswer FROM (
-          -- Select 3 random incorrect correspondents
-          SELECT c.id, c.fullname, 'false'::boolean isanswer
-          FROM correspondents c
-          WHERE c.id != rs.correct_correspondent_id
-		  AND c.gender = rs.correct_correspondent_gender
+          -- Select 3 random incorrect correspondents of the same gender:
+          -- every position of a small group, otherwise 16 random positions
+          SELECT g.ids[i] AS id, g.names[i] AS fullname, 'false'::boolean isanswer
+          FROM quiz_genders g
+          CROSS JOIN LATERAL (
+            SELECT generate_series(1, CASE WHEN cardinality(g.ids) <= 16 THEN cardinality(g.ids) ELSE 0 END) AS i
+            UNION
+            SELECT 1 + floor(random() * cardinality(g.ids))::int
+            FROM generate_series(1, CASE WHEN cardinality(g.ids) > 16 THEN 16 ELSE 0 END)
+          ) positions
+          WHERE g.gender = rs.correct_correspondent_gender
+		  AND g.ids[i] != rs.correct_correspondent_id
           ORDER BY random()
           LIMIT 3
         ) distractors
@@ -41,7 +57,6 @@ question_with_options AS (
         	rs.correct_correspondent_name,
         	'true'::boolean isanswer
       ) all_choices
-      ORDER BY random()
     ) AS options
   FROM random_segments rs
 )
@@ -51,4 +66,4 @@ SELECT json_agg(row_to_json(payload)) FROM
 	audio_url,
 	encode(cast(options::text as bytea), 'hex') options
 	from question_with_options
-) payload
\ No newline at end of file
+) payload
@@ -0,0 +1,2 @@
+-- Per-segment speaker embeddings, stored alongside each clip
+ALTER TABLE audio_segments ADD COLUMN IF NOT EXISTS segment_embedding vector(256);
@@ -0,0 +1,5 @@
+-- Approximate nearest-neighbour index for cosine similarity lookups
+-- (ORDER BY embedding <=> $1 LIMIT k). Requires pgvector >= 0.5.0.
+CREATE INDEX IF NOT EXISTS correspondents_embedding_hnsw_idx
+    ON correspondents USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
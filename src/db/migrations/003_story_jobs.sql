@@ -0,0 +1,19 @@
+-- Durable per-story processing queue. Workers claim rows with
+-- FOR UPDATE SKIP LOCKED and checkpoint the last completed stage.
+CREATE TABLE IF NOT EXISTS story_jobs (
+    id SERIAL PRIMARY KEY,
+    audio_url TEXT UNIQUE NOT NULL,
+    story JSONB NOT NULL,
+    status VARCHAR NOT NULL DEFAULT 'pending',  -- pending | running | done | failed | review
+    stage VARCHAR NOT NULL DEFAULT 'queued',    -- last completed stage
+    artifacts JSONB NOT NULL DEFAULT '{}',
+    attempts INT NOT NULL DEFAULT 0,
+    last_error TEXT,
+    worker VARCHAR,
+    locked_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS story_jobs_claim_idx
+    ON story_jobs (id) WHERE status IN ('pending', 'running');
@@ -0,0 +1,43 @@
+-- Precomputed sampling tables for quiz generation, so a quiz is a handful
+-- of index lookups instead of ORDER BY random() over every correspondent
+-- and segment. Rebuild with SELECT refresh_quiz_sampling() after loading stories.
+
+-- Older databases created audio_segments before the storage columns were in schema.sql
+ALTER TABLE audio_segments
+    ADD COLUMN IF NOT EXISTS storage_url TEXT,
+    ADD COLUMN IF NOT EXISTS public_url TEXT;
+
+-- One row per correspondent with at least one published clip. rn is dense
+-- (1..count), so a random rank is a random correspondent.
+CREATE MATERIALIZED VIEW IF NOT EXISTS quiz_correspondents AS
+SELECT row_number() OVER (ORDER BY c.id)::int AS rn,
+       c.id, c.fullname, c.gender,
+       array_agg(s.public_url ORDER BY s.id) AS segment_urls
+FROM correspondents c
+JOIN audio a ON a.correspondent_id = c.id
+JOIN audio_segments s ON s.audio_id = a.id
+WHERE s.public_url IS NOT NULL
+GROUP BY c.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS quiz_correspondents_rn_idx ON quiz_correspondents (rn);
+CREATE UNIQUE INDEX IF NOT EXISTS quiz_correspondents_id_idx ON quiz_correspondents (id);
+
+-- Every correspondent's id and name per gender, for drawing distractors
+-- by random array position.
+CREATE MATERIALIZED VIEW IF NOT EXISTS quiz_genders AS
+SELECT gender,
+       array_agg(id ORDER BY id) AS ids,
+       array_agg(fullname ORDER BY id) AS names
+FROM correspondents
+WHERE gender IS NOT NULL
+GROUP BY gender;
+
+CREATE UNIQUE INDEX IF NOT EXISTS quiz_genders_gender_idx ON quiz_genders (gender);
+
+CREATE OR REPLACE FUNCTION refresh_quiz_sampling() RETURNS void AS $$
+BEGIN
+    -- CONCURRENTLY keeps the views readable while they rebuild
+    REFRESH MATERIALIZED VIEW CONCURRENTLY quiz_correspondents;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY quiz_genders;
+END;
+$$ LANGUAGE plpgsql;
@@ -23,6 +23,69 @@ CREATE TABLE audio_segments (
     start_time_sec DECIMAL(10, 1) NOT NULL,
     end_time_sec DECIMAL(10, 1) NOT NULL,
     duration_sec DECIMAL(10, 1) NOT NULL,
-    url TEXT UNIQUE
-    -- Optionally: segment_embedding vector(256)
-);
\ No newline at end of file
+    url TEXT UNIQUE,
+    storage_url TEXT,
+    public_url TEXT,
+    segment_embedding vector(256)
+);
+
+-- Nearest-neighbour index for similarity lookups
+CREATE INDEX correspondents_embedding_hnsw_idx
+    ON correspondents USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
+
+-- Applied files from db/migrations
+CREATE TABLE schema_migrations (
+    version VARCHAR PRIMARY KEY,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Durable per-story processing queue (see audio_processor/jobs.py)
+CREATE TABLE story_jobs (
+    id SERIAL PRIMARY KEY,
+    audio_url TEXT UNIQUE NOT NULL,
+    story JSONB NOT NULL,
+    status VARCHAR NOT NULL DEFAULT 'pending',
+    stage VARCHAR NOT NULL DEFAULT 'queued',
+    artifacts JSONB NOT NULL DEFAULT '{}',
+    attempts INT NOT NULL DEFAULT 0,
+    last_error TEXT,
+    worker VARCHAR,
+    locked_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX story_jobs_claim_idx
+    ON story_jobs (id) WHERE status IN ('pending', 'running');
+
+-- Quiz sampling (see db/migrations/004_quiz_sampling.sql); rebuilt by refresh_quiz_sampling()
+CREATE MATERIALIZED VIEW quiz_correspondents AS
+SELECT row_number() OVER (ORDER BY c.id)::int AS rn,
+       c.id, c.fullname, c.gender,
+       array_agg(s.public_url ORDER BY s.id) AS segment_urls
+FROM correspondents c
+JOIN audio a ON a.correspondent_id = c.id
+JOIN audio_segments s ON s.audio_id = a.id
+WHERE s.public_url IS NOT NULL
+GROUP BY c.id;
+
+CREATE UNIQUE INDEX quiz_correspondents_rn_idx ON quiz_correspondents (rn);
+CREATE UNIQUE INDEX quiz_correspondents_id_idx ON quiz_correspondents (id);
+
+CREATE MATERIALIZED VIEW quiz_genders AS
+SELECT gender,
+       array_agg(id ORDER BY id) AS ids,
+       array_agg(fullname ORDER BY id) AS names
+FROM correspondents
+WHERE gender IS NOT NULL
+GROUP BY gender;
+
+CREATE UNIQUE INDEX quiz_genders_gender_idx ON quiz_genders (gender);
+
+CREATE FUNCTION refresh_quiz_sampling() RETURNS void AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY quiz_correspondents;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY quiz_genders;
+END;
+$$ LANGUAGE plpgsql;
@@ -1,55 +1,134 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-import requests
+from quiz_pool import QuizPool, QUIZ_POOL_SIZE
+import asyncio
+import httpx
+import json
 import os
+import random
 
-app = FastAPI()
+QUIZ_QUESTIONS = int(os.getenv("QUIZ_QUESTIONS", 10))
+
+# Xata client: one keep-alive connection pool per process
+XATA_TIMEOUT_SEC = float(os.getenv("XATA_TIMEOUT_SEC", 10))
+XATA_CONNECT_TIMEOUT_SEC = float(os.getenv("XATA_CONNECT_TIMEOUT_SEC", 3))
+XATA_MAX_CONNECTIONS = int(os.getenv("XATA_MAX_CONNECTIONS", 20))
+XATA_RETRIES = int(os.getenv("XATA_RETRIES", 2))
+XATA_RETRY_BACKOFF_SEC = float(os.getenv("XATA_RETRY_BACKOFF_SEC", 0.2))
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global xata_client
+    xata_client = httpx.AsyncClient(
+        http2=http2_available(),
+        headers={"Authorization": f"Bearer {XATA_API_KEY}"},
+        timeout=httpx.Timeout(XATA_TIMEOUT_SEC, connect=XATA_CONNECT_TIMEOUT_SEC),
+        limits=httpx.Limits(max_connections=XATA_MAX_CONNECTIONS, max_keepalive_connections=XATA_MAX_CONNECTIONS),
+    )
+    if QUIZ_POOL_SIZE > 0:
+        quiz_pool.start()
+    yield
+    await quiz_pool.stop()
+    await xata_client.aclose()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["GET", "POST", "OPTIONS"], allow_headers=["*"])
 
 SECRETS_PATH = os.getenv("SECRETS_PATH", "/etc/secrets")
-with open(f"{SECRETS_PATH}/xata-api-token", 'r') as f:
-    XATA_API_KEY = f.read().strip()
+XATA_API_KEY = os.getenv("XATA_API_KEY")
+if not XATA_API_KEY:
+    with open(f"{SECRETS_PATH}/xata-api-token", 'r') as f:
+        XATA_API_KEY = f.read().strip()
 
 XATA_API_URL = os.getenv("XATA_API_URL", "https://danielmustafa-s-workspace-b2b2e6.us-east-1.xata.sh/db/npr-audio-quiz:main/sql")
 
+# Samples the quiz_correspondents / quiz_genders materialized views (db/migrations/004_quiz_sampling.sql) by random rank and array position instead of ORDER BY random() over whole tables
 DEFAULT_GENERATE_QUIZ_SQL = """
-with random_correspondents as( select id as correspondent_id from correspondents order by random() limit 10), random_segments as( select distinct on (corr.id) corr.id as correct_correspondent_id, corr.fullname as correct_correspondent_name, corr.gender as correct_correspondent_gender, asegs.public_url as audio_url from random_correspondents rc join correspondents corr on corr.id = rc.correspondent_id join audio on audio.correspondent_id = corr.id join audio_segments asegs on audio.id = asegs.audio_id order by corr.id, random()), question_with_options as ( select rs.correct_correspondent_id correspondent_id, rs.correct_correspondent_name correspondent_name, rs.audio_url, ( select json_agg(json_build_object('id', id, 'full_name', fullname, 'is_answer', isanswer)) from ( select id, fullname, isanswer from ( select c.id, c.fullname, 'false'::boolean isanswer from correspondents c where c.id != rs.correct_correspondent_id and c.gender = rs.correct_correspondent_gender order by random() limit 3 ) distractors union all select rs.correct_correspondent_id, rs.correct_correspondent_name, 'true'::boolean isanswer ) all_choices order by random() ) as options from random_segments rs ) select audio_url, encode(cast(options::text as bytea), 'hex') options from question_with_options
+with roster as (select coalesce(max(rn), 0) as size from quiz_correspondents), picks as (select rn from (select generate_series(1, case when size <= {questions} * 8 then size else 0 end) as rn from roster union select 1 + floor(random() * size)::int from roster, generate_series(1, case when size > {questions} * 8 then {questions} * 3 else 0 end)) ranks order by random() limit {questions}), questions as (select qc.id, qc.fullname, qc.gender, qc.segment_urls[1 + floor(random() * cardinality(qc.segment_urls))::int] as audio_url from picks join quiz_correspondents qc on qc.rn = picks.rn), question_with_options as ( select q.id correspondent_id, q.audio_url, ( select json_agg(json_build_object('id', id, 'full_name', fullname, 'is_answer', isanswer) order by random()) from ( select id, fullname, isanswer from ( select g.ids[i] as id, g.names[i] as fullname, 'false'::boolean isanswer from quiz_genders g cross join lateral ( select generate_series(1, case when cardinality(g.ids) <= 16 then cardinality(g.ids) else 0 end) as i union select 1 + floor(random() * cardinality(g.ids))::int from generate_series(1, case when cardinality(g.ids) > 16 then 16 else 0 end) ) positions where g.gender = q.gender and g.ids[i] != q.id order by random() limit 3 ) distractors union all select q.id, q.fullname, 'true'::boolean isanswer ) all_choices ) as options from questions q ) select correspondent_id, audio_url, encode(cast(options::text as bytea), 'hex') options from question_with_options
 """
 
+# {questions} is replaced with the number of questions to generate
 GENERATE_QUIZ_SQL = os.getenv("GENERATE_QUIZ_SQL", DEFAULT_GENERATE_QUIZ_SQL)
 
 
-def post(request):
-    try:
-        res = requests.post(
-            XATA_API_URL,
-            headers={"Authorization": f"Bearer {XATA_API_KEY}"},
-            json=request
-        )
-    except requests.RequestException as e:
-        print(f"Error connecting to Xata API: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error retrieving quiz details")
-
-    if res.status_code != 200:
-        raise HTTPException(status_code=res.status_code, detail="Failed to retrieve quiz data")
-    
-    return res.json()
+# Created in lifespan, on the server's event loop
+xata_client = None
+
+# In-flight coalesced Xata requests by body: concurrent identical reads share one call
+_inflight = {}
+
+async def post(request, coalesce: bool = False):
+    """
+    Send a statement to Xata. With coalesce, concurrent identical requests
+    share one call; only use it for idempotent reads, never for statements
+    whose result is meant to differ per call (e.g. the random quiz sample).
+    """
+    if not coalesce:
+        return await _post(request)
+    key = json.dumps(request, sort_keys=True)
+    if key not in _inflight:
+        _inflight[key] = asyncio.ensure_future(_post(request))
+        _inflight[key].add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: a cancelled caller must not cancel the call other callers wait on
+    return await asyncio.shield(_inflight[key])
+
+async def _post(request):
+    for attempt in range(XATA_RETRIES + 1):
+        try:
+            res = await xata_client.post(XATA_API_URL, json=request)
+        except httpx.HTTPError as e:
+            if attempt < XATA_RETRIES:
+                await _backoff(attempt)
+                continue
+            print(f"Error connecting to Xata API: {str(e)}")
+            raise HTTPException(status_code=500, detail="Error retrieving quiz details")
+
+        if res.status_code in RETRY_STATUSES and attempt < XATA_RETRIES:
+            await _backoff(attempt)
+            continue
+        if res.status_code != 200:
+            raise HTTPException(status_code=res.status_code, detail="Failed to retrieve quiz data")
+
+        return res.json()
+
+async def _backoff(attempt: int):
+    # Full jitter so retrying instances don't hit Xata in lockstep
+    await asyncio.sleep(random.uniform(0, XATA_RETRY_BACKOFF_SEC * 2 ** attempt))
+
+async def fetch_questions(questions: int) -> list:
+    return (await post({"statement": GENERATE_QUIZ_SQL.replace("{questions}", str(questions))})).get("records", [])
+
+quiz_pool = QuizPool(fetch_questions)
 
 @app.get("/generate-quiz")
-def generate_quiz():
+async def generate_quiz():
 
-    quiz_data = post({"statement": GENERATE_QUIZ_SQL})
+    records = quiz_pool.take(QUIZ_QUESTIONS) if QUIZ_POOL_SIZE > 0 else None
+    if records is None:
+        records = await fetch_questions(QUIZ_QUESTIONS)
+    # correspondent_id is only for deduplication; the answer stays inside the encoded options
+    records = [{key: value for key, value in record.items() if key != "correspondent_id"} for record in records]
 
     result = {
-        "quiz": quiz_data.get("records", []),
+        "quiz": records,
         "metadata": {
-            "total_questions": len(quiz_data.get("records", [])),
+            "total_questions": len(records),
         }
     }
     return JSONResponse(content=result)
 
 @app.get("/health")
-def health_check():
-    res = post({"statement": "SELECT 1"})
-    return JSONResponse(content={"status": "ok"})
\ No newline at end of file
+async def health_check():
+    res = await post({"statement": "SELECT 1"}, coalesce=True)
+    return JSONResponse(content={"status": "ok", "quiz_pool": quiz_pool.get_metrics()})
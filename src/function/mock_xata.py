@@ -0,0 +1,50 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import asyncio
+import json
+import os
+import random
+import re
+
+# A stand-in for the Xata SQL endpoint for local runs and load tests:
+#   uvicorn mock_xata:app --port 8081
+#   XATA_API_URL=http://localhost:8081/sql XATA_API_KEY=test uvicorn main:app --port 8080
+MOCK_LATENCY_SEC = float(os.getenv("MOCK_LATENCY_SEC", 0.05))
+# Share of requests answered with a 503, to exercise retries
+MOCK_FAILURE_RATE = float(os.getenv("MOCK_FAILURE_RATE", 0.0))
+
+app = FastAPI()
+metrics = {"requests": 0, "failures": 0}
+
+
+def question(n: int) -> dict:
+    answer = random.randrange(4)
+    options = [
+        {"id": n * 4 + i, "full_name": f"Correspondent {n * 4 + i}", "is_answer": i == answer}
+        for i in range(4)
+    ]
+    return {
+        "correspondent_id": n * 4 + answer,
+        "audio_url": f"https://storage.googleapis.com/mock/{n}.mp3",
+        "options": json.dumps(options).encode().hex(),
+    }
+
+@app.post("/sql")
+async def sql(request: Request):
+    metrics["requests"] += 1
+    await asyncio.sleep(MOCK_LATENCY_SEC)
+    if random.random() < MOCK_FAILURE_RATE:
+        metrics["failures"] += 1
+        return JSONResponse(status_code=503, content={"message": "mock failure"})
+
+    statement = (await request.json()).get("statement", "")
+    if statement.strip().upper() == "SELECT 1":
+        return {"records": [{"?column?": 1}]}
+    # The quiz statement limits its picks to the number of questions
+    match = re.search(r"limit (\d+)\)", statement)
+    questions = int(match.group(1)) if match else 10
+    return {"records": [question(random.randrange(10_000)) for _ in range(questions)]}
+
+@app.get("/metrics")
+def get_metrics():
+    return metrics
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import random
+import time
+
+# In-memory pool of pre-generated questions; QUIZ_POOL_SIZE=0 queries per request
+QUIZ_POOL_SIZE = int(os.getenv("QUIZ_POOL_SIZE", 500))
+QUIZ_POOL_BATCH = int(os.getenv("QUIZ_POOL_BATCH", 250))
+QUIZ_POOL_TTL_SEC = float(os.getenv("QUIZ_POOL_TTL_SEC", 15 * 60))
+QUIZ_POOL_REFILL_SEC = float(os.getenv("QUIZ_POOL_REFILL_SEC", 30))
+
+
+class QuizPool:
+    """
+    Pre-generated quiz questions held in memory. A background task tops
+    the pool up to target_size in batches of batch_size whenever it falls
+    below half, or every refill_sec; questions older than ttl_sec are not
+    served. take() removes the questions it returns, so a question is
+    served once. Everything runs on the event loop, so no locking is needed.
+    """
+
+    def __init__(self, fetch, target_size: int = QUIZ_POOL_SIZE, batch_size: int = QUIZ_POOL_BATCH,
+                 ttl_sec: float = QUIZ_POOL_TTL_SEC, refill_sec: float = QUIZ_POOL_REFILL_SEC):
+        self.fetch = fetch  # async questions -> list of question records
+        self.target_size = target_size
+        self.batch_size = batch_size
+        self.ttl_sec = ttl_sec
+        self.refill_sec = refill_sec
+        self._items = []  # (expires_at, record)
+        self._wake = asyncio.Event()
+        self._task = None
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "refills": 0,
+            "refill_errors": 0,
+            "questions_loaded": 0,
+            "questions_served": 0,
+            "questions_expired": 0,
+            "last_refill_sec": None,
+        }
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def take(self, questions: int):
+        """questions random records (distinct correspondents) from the pool, or None if it cannot cover them."""
+        now = time.monotonic()
+        taken, duplicates, correspondents = [], [], set()
+        items = self._items
+        while len(taken) < questions and items:
+            # Swap-remove a random entry: O(1) per question
+            index = random.randrange(len(items))
+            items[index], items[-1] = items[-1], items[index]
+            expires_at, record = items.pop()
+            if expires_at < now:
+                self.metrics["questions_expired"] += 1
+            elif self._correspondent(record) in correspondents:
+                duplicates.append((expires_at, record))
+            else:
+                taken.append((expires_at, record))
+                correspondents.add(self._correspondent(record))
+        items.extend(duplicates)
+
+        if len(taken) < questions:
+            # Put back what was drawn; the caller falls back to the database
+            items.extend(taken)
+            self.metrics["misses"] += 1
+            taken = None
+        else:
+            self.metrics["hits"] += 1
+            self.metrics["questions_served"] += questions
+        if len(items) < self.target_size // 2:
+            self._wake.set()
+        return [record for _, record in taken] if taken is not None else None
+
+    @staticmethod
+    def _correspondent(record: dict):
+        # Batches are fetched separately, so the same correspondent can be pooled with several clips
+        return record.get("correspondent_id", record.get("audio_url"))
+
+    async def refill(self):
+        """Drop expired questions and fetch batches until the pool reaches target_size."""
+        now = time.monotonic()
+        fresh = [item for item in self._items if item[0] >= now]
+        self.metrics["questions_expired"] += len(self._items) - len(fresh)
+        self._items = fresh
+
+        start_time = time.perf_counter()
+        while (missing := self.target_size - len(self._items)) > 0:
+            records = await self.fetch(min(self.batch_size, missing))
+            if not records:
+                break
+            expires_at = time.monotonic() + self.ttl_sec
+            self._items.extend((expires_at, record) for record in records)
+            self.metrics["questions_loaded"] += len(records)
+        self.metrics["refills"] += 1
+        self.metrics["last_refill_sec"] = round(time.perf_counter() - start_time, 3)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refill()
+            except Exception as e:
+                self.metrics["refill_errors"] += 1
+                print(f"Error refilling quiz pool: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.refill_sec)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def get_metrics(self) -> dict:
+        metrics = dict(self.metrics)
+        metrics["size"] = len(self._items)
+        metrics["target_size"] = self.target_size
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = metrics["hits"] / lookups if lookups else 0.0
+        return metrics
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The pipeline modules import each other by bare name (run from src/audio_processor)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "audio_processor"))
+# The quiz function's modules; appended so its main.py does not shadow the pipeline's
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "function"))
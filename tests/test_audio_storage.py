@@ -0,0 +1,38 @@
+import pytest
+
+import audio_storage
+import storage_service
+
+
+@pytest.fixture
+def backend():
+    backend = storage_service.MemoryBackend()
+    storage_service.set_backend(backend)
+    yield backend
+    storage_service.set_backend(None)
+
+
+def clips(tmp_path, count, missing=()):
+    segments = []
+    for segment_id in range(count):
+        path = tmp_path / f"{segment_id}.mp3"
+        if segment_id not in missing:
+            path.write_bytes(b"clip %d" % segment_id)
+        segments.append(({"mp3_audio_path": str(path)}, segment_id))
+    return segments
+
+
+def test_save_segments_returns_urls_in_order(tmp_path, backend):
+    urls = audio_storage.save_segments((1, 2), clips(tmp_path, 3))
+
+    assert [segment_id for segment_id, _, _ in urls] == [0, 1, 2]
+    assert urls[1][2] == f"memory://{audio_storage.GCS_BUCKET_NAME}/1/2/1.mp3"
+    assert audio_storage.get_segment(1, 2, 2) == b"clip 2"
+
+
+def test_failed_upload_deletes_the_clips_already_saved(tmp_path, backend):
+    # The 3rd of 5 clips fails; the other 4 upload but must not be left behind
+    with pytest.raises(FileNotFoundError, match="2.mp3"):
+        audio_storage.save_segments((1, 2), clips(tmp_path, 5, missing={2}))
+
+    assert backend.blobs == {}
@@ -0,0 +1,63 @@
+import os
+import time
+
+import diarization_cache
+
+RAW = [
+    {"segment_id": 0, "speaker_id": "SPEAKER_00", "start_time": 0.0, "end_time": 4.5, "duration_sec": 4.5},
+    {"segment_id": 1, "speaker_id": "SPEAKER_01", "start_time": 4.5, "end_time": 9.0, "duration_sec": 4.5},
+    {"segment_id": 2, "speaker_id": "SPEAKER_00", "start_time": 9.0, "end_time": 20.0, "duration_sec": 11.0},
+]
+SEGMENTS = [dict(RAW[0], end_time=9.0, duration_sec=9.0, speaker_id="SPEAKER_00"), RAW[2]]
+
+
+def test_round_trip(tmp_path):
+    cache = diarization_cache.DiarizationCache(str(tmp_path))
+    key = diarization_cache.cache_key("abc", {"model": "m", "version": 1})
+    assert cache.get(key) is None
+    cache.put(key, RAW, SEGMENTS, 1)
+
+    entry = cache.get(key)
+    assert entry == {"raw": RAW, "segments": SEGMENTS, "consolidation_version": 1}
+    metrics = cache.get_metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["writes"], metrics["entries"]) == (1, 1, 1, 1)
+
+
+def test_cache_key_depends_on_params():
+    assert diarization_cache.cache_key("abc", {"a": 1, "b": 2}) == diarization_cache.cache_key("abc", {"b": 2, "a": 1})
+    assert diarization_cache.cache_key("abc", {"a": 1}) != diarization_cache.cache_key("abc", {"a": 2})
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = diarization_cache.DiarizationCache(str(tmp_path))
+    keys = [f"key{i}" for i in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, RAW, SEGMENTS, 1)
+        # Distinct, increasing mtimes without sleeping
+        past = time.time() - 100 + age
+        os.utime(cache._path(key), (past, past))
+    entry_size = os.path.getsize(cache._path(keys[0]))
+
+    cache.get(keys[0])  # key0 becomes the most recently used
+    cache.max_bytes = entry_size * 2
+    cache.evict()
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+    assert cache.get_metrics()["evictions"] == 1
+
+
+def test_put_keeps_the_new_entry_even_when_over_budget(tmp_path):
+    cache = diarization_cache.DiarizationCache(str(tmp_path), max_bytes=1)
+    cache.put("old", RAW, SEGMENTS, 1)
+    cache.put("new", RAW, SEGMENTS, 1)
+    assert cache.get("old") is None
+    assert cache.get("new") is not None
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = diarization_cache.DiarizationCache(str(tmp_path))
+    with open(cache._path("bad"), "wb") as f:
+        f.write(b"not gzip")
+    assert cache.get("bad") is None
@@ -0,0 +1,85 @@
+import pytest
+from urllib3.exceptions import IncompleteRead, ProtocolError
+
+import downloader
+
+SIZE = 300_000
+URL = f"https://example.org/audio/story.mp3?size={SIZE}"
+BODY = bytes(i % 251 for i in range(SIZE))
+
+
+class FakeRaw:
+    def __init__(self, body: bytes, fail_after: int = None):
+        self.body = body
+        self.position = 0
+        self.fail_after = fail_after
+
+    def read(self, amount, decode_content=True):
+        if self.fail_after is not None and self.position >= self.fail_after:
+            raise ProtocolError("Connection broken", IncompleteRead(self.position, len(self.body) - self.position))
+        end = self.position + amount
+        if self.fail_after is not None:
+            end = min(end, self.fail_after)
+        chunk = self.body[self.position:end]
+        self.position += len(chunk)
+        return chunk
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body: bytes, fail_after: int = None):
+        self.status_code = status_code
+        self.headers = {"Content-Length": str(len(body))}
+        self.raw = FakeRaw(body, fail_after)
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Drops the connection partway through the first response, then honours Range requests."""
+
+    def __init__(self, drop_after: int):
+        self.drop_after = drop_after
+        self.requests = []
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        headers = headers or {}
+        self.requests.append(headers)
+        if len(self.requests) == 1:
+            return FakeResponse(200, BODY, fail_after=self.drop_after)
+        start = int(headers["Range"].removeprefix("bytes=").rstrip("-")) if "Range" in headers else 0
+        return FakeResponse(206 if start else 200, BODY[start:])
+
+
+def test_truncated_body_is_retried_with_a_range_request(tmp_path):
+    manager = downloader.DownloadManager(str(tmp_path), backoff_sec=0)
+    manager.session = FakeSession(drop_after=100_000)
+
+    path = manager.get(URL)
+
+    assert manager.session.requests == [{}, {"Range": "bytes=100000-"}]
+    assert open(path, "rb").read() == BODY
+
+
+def test_gives_up_after_retries(tmp_path):
+    class AlwaysDrops(FakeSession):
+        def get(self, url, headers=None, stream=False, timeout=None):
+            self.requests.append(headers or {})
+            return FakeResponse(200, BODY, fail_after=0)
+
+    manager = downloader.DownloadManager(str(tmp_path), retries=2, backoff_sec=0)
+    manager.session = AlwaysDrops(drop_after=0)
+    with pytest.raises(downloader.DownloadError, match="Giving up on .* after 3 attempt"):
+        manager.get(URL)
+    assert len(manager.session.requests) == 3
+
+
+def test_cache_key_ignores_query_string():
+    assert downloader.cache_key(URL) == downloader.cache_key("https://example.org/audio/story.mp3?e=player")
+    assert downloader.expected_size(URL) == SIZE
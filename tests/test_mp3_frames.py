@@ -0,0 +1,73 @@
+import pytest
+
+import mp3_frames
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo, no CRC: 417-byte frames
+MPEG1_128K = bytes([0xFF, 0xFB, 0x90, 0x00])
+# MPEG-2 Layer III, 8 kbps, 22.05 kHz, mono, no CRC: 26-byte frames
+MPEG2_8K_MONO = bytes([0xFF, 0xF3, 0x10, 0xC0])
+
+
+def stream(header: bytes, count: int) -> bytes:
+    length = mp3_frames.parse_header(header + bytes(4), 0)["length"]
+    return b"".join(header + bytes([i % 256]) * (length - 4) for i in range(count))
+
+
+def test_parse_header():
+    frame = mp3_frames.parse_header(MPEG1_128K, 0)
+    assert frame["sample_rate"] == 44100
+    assert frame["samples_per_frame"] == 1152
+    assert frame["length"] == 417
+    assert mp3_frames.parse_header(b"\x00\x00\x00\x00", 0) is None
+
+
+def test_read_frames_skips_id3_and_garbage():
+    id3 = b"ID3\x04\x00\x00\x00\x00\x00\x05" + bytes(5)
+    data = id3 + b"junk" + stream(MPEG1_128K, 10)
+    frames = mp3_frames.read_frames(data)
+    assert len(frames) == 10
+    assert frames[0][0] == len(id3) + 4
+    assert all(b[0] - a[0] == 417 for a, b in zip(frames, frames[1:]))
+
+
+def test_read_frames_rejects_non_mp3():
+    with pytest.raises(mp3_frames.Mp3FormatError):
+        mp3_frames.read_frames(bytes(1000))
+
+
+def test_frame_range_snaps_outwards():
+    frames = mp3_frames.read_frames(stream(MPEG1_128K, 100))
+    frame_sec = 1152 / 44100
+    assert mp3_frames.frame_range(frames, 0, frame_sec * 9.5) == (0, 10)
+    assert mp3_frames.frame_range(frames, frame_sec * 2.5, frame_sec * 4.5) == (2, 5)
+    assert mp3_frames.frame_range(frames, 0, 1000) == (0, 100)
+    with pytest.raises(mp3_frames.Mp3FormatError):
+        mp3_frames.frame_range(frames, 1000, 1001)
+
+
+def test_write_clip_copies_frames_behind_info_header(tmp_path):
+    data = stream(MPEG1_128K, 100)
+    frames = mp3_frames.read_frames(data)
+    frame_sec = 1152 / 44100
+    out = mp3_frames.write_clip(data, frames, frame_sec * 10.5, frame_sec * 19.5, str(tmp_path / "clip.mp3"))
+
+    clip = open(out, "rb").read()
+    # The Info frame is recognized (and skipped) when the clip is indexed again
+    clip_frames = mp3_frames.read_frames(clip)
+    assert len(clip_frames) == 10
+    header_length = clip_frames[0][0]
+    assert clip[4 + 32:4 + 32 + 4] == b"Info"
+    assert clip[header_length:] == data[frames[10][0]:frames[20][0]]
+
+
+def test_xing_frame_fits_low_bitrate_mpeg2(tmp_path):
+    data = stream(MPEG2_8K_MONO, 50)
+    frames = mp3_frames.read_frames(data)
+    assert frames[0][1]["length"] == 26  # too small for side info + a 16-byte tag
+
+    out = mp3_frames.write_clip(data, frames, 0, 1, str(tmp_path / "clip.mp3"))
+    clip = open(out, "rb").read()
+    header_frame = mp3_frames.parse_header(clip, 0)
+    assert header_frame["length"] == 52  # bumped to 16 kbps
+    assert clip[4 + 9:4 + 9 + 4] == b"Info"
+    assert mp3_frames.read_frames(clip)[0][0] == 52
@@ -0,0 +1,90 @@
+import threading
+
+import pipeline
+
+
+def run(stages, items, **kwargs):
+    runner = pipeline.Pipeline(stages, **kwargs)
+    return runner, list(runner.run(items))
+
+
+def test_items_flow_through_every_stage():
+    runner, results = run([
+        pipeline.Stage("double", lambda x: x * 2),
+        pipeline.Stage("inc", lambda x: x + 1),
+    ], range(10))
+    assert sorted(results) == [x * 2 + 1 for x in range(10)]
+    assert [row["items"] for row in runner.report()] == [10, 10]
+
+
+def test_dropped_and_failed_items_are_counted_and_discarded():
+    discarded = []
+    lock = threading.Lock()
+
+    def on_discard(item):
+        with lock:
+            discarded.append(item)
+
+    def keep_even(x):
+        return x if x % 2 == 0 else None
+
+    def fail_on_four(x):
+        if x == 4:
+            raise ValueError("boom")
+        return x
+
+    runner, results = run([
+        pipeline.Stage("filter", keep_even, workers=2),
+        pipeline.Stage("check", fail_on_four, workers=3),
+    ], range(10), on_discard=on_discard)
+
+    assert sorted(results) == [0, 2, 6, 8]
+    filter_row, check_row = runner.report()
+    assert (filter_row["items"], filter_row["dropped"], filter_row["errors"]) == (10, 5, 0)
+    assert (check_row["items"], check_row["dropped"], check_row["errors"]) == (5, 0, 1)
+    assert sorted(discarded) == [1, 3, 4, 5, 7, 9]
+
+
+def test_on_error_sees_only_failed_items_before_they_are_discarded():
+    events = []
+    lock = threading.Lock()
+
+    def on_error(item):
+        item["failed"] = True
+        with lock:
+            events.append(("error", item["n"]))
+
+    def on_discard(item):
+        with lock:
+            events.append(("discard", item["n"], item.get("failed", False)))
+
+    def stage(item):
+        if item["n"] == 1:
+            return None
+        if item["n"] == 2:
+            raise ValueError("boom")
+        return item
+
+    _, results = run([pipeline.Stage("stage", stage, workers=2)], ({"n": n} for n in range(3)),
+                     on_discard=on_discard, on_error=on_error)
+
+    assert [item["n"] for item in results] == [0]
+    # on_error runs first, so on_discard can tell the failed item from the dropped one
+    assert sorted(events, key=str) == [("discard", 1, False), ("discard", 2, True), ("error", 2)]
+
+
+def test_bad_input_iterable_ends_the_run():
+    def items():
+        yield 1
+        raise RuntimeError("source failed")
+
+    _, results = run([pipeline.Stage("same", lambda x: x)], items())
+    assert results == [1]
+
+
+def test_report_has_latency_and_utilization():
+    runner, _ = run([pipeline.Stage("same", lambda x: x, workers=2)], range(20), queue_size=1)
+    row = runner.report()[0]
+    assert row["workers"] == 2
+    assert row["p95_sec"] >= row["p50_sec"] >= 0
+    assert 0 <= row["utilization"] <= 1
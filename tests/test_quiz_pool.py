@@ -0,0 +1,86 @@
+import asyncio
+import importlib.util
+import os
+
+import pytest
+
+from quiz_pool import QuizPool
+
+MAIN_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "function", "main.py")
+
+
+def record(correspondent_id, clip):
+    return {"correspondent_id": correspondent_id, "audio_url": f"https://example.com/{correspondent_id}/{clip}.mp3", "options": ""}
+
+
+def stub_fetch(batches):
+    """An async fetch returning the given batches in turn, then nothing."""
+    batches = list(batches)
+    calls = []
+
+    async def fetch(questions):
+        calls.append(questions)
+        return batches.pop(0) if batches else []
+    return fetch, calls
+
+
+def filled_pool(records, **kwargs):
+    fetch, _ = stub_fetch([records])
+    pool = QuizPool(fetch, target_size=len(records), batch_size=len(records), **kwargs)
+    asyncio.run(pool.refill())
+    return pool
+
+
+def test_refill_fetches_batches_up_to_target_size():
+    fetch, calls = stub_fetch([[record(c, 0) for c in range(4)], [record(c, 0) for c in range(4, 8)], [record(8, 0)]])
+    pool = QuizPool(fetch, target_size=10, batch_size=4)
+
+    asyncio.run(pool.refill())
+
+    assert calls == [4, 4, 2, 1]  # the short third batch leaves 1 missing; an empty batch ends the refill
+    metrics = pool.get_metrics()
+    assert (metrics["size"], metrics["questions_loaded"], metrics["refills"]) == (9, 9, 1)
+
+
+def test_take_serves_distinct_correspondents():
+    pool = filled_pool([record(c, clip) for c in range(5) for clip in range(3)])
+
+    for _ in range(3):
+        taken = pool.take(5)
+        assert sorted(r["correspondent_id"] for r in taken) == list(range(5))
+    assert pool.take(1) is None
+    metrics = pool.get_metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["questions_served"], metrics["size"]) == (3, 1, 15, 0)
+
+
+def test_take_misses_without_enough_correspondents_and_keeps_the_questions():
+    # Four clips but only two correspondents: nothing is served and nothing is lost
+    pool = filled_pool([record(c, clip) for c in range(2) for clip in range(2)])
+
+    assert pool.take(3) is None
+    assert pool.get_metrics()["size"] == 4
+    assert len(pool.take(2)) == 2
+
+
+def test_take_and_refill_drop_expired_questions():
+    pool = filled_pool([record(c, 0) for c in range(3)], ttl_sec=-1)
+
+    assert pool.take(1) is None
+    metrics = pool.get_metrics()
+    assert (metrics["questions_expired"], metrics["size"]) == (3, 0)
+
+
+def test_generate_quiz_strips_correspondent_id(monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    monkeypatch.setenv("XATA_API_KEY", "test")
+    # Loaded by path: src/audio_processor/main.py is importable as "main" too
+    spec = importlib.util.spec_from_file_location("quiz_function", MAIN_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "quiz_pool", filled_pool([record(c, 0) for c in range(module.QUIZ_QUESTIONS)]))
+
+    response = asyncio.run(module.generate_quiz())
+
+    body = response.body.decode()
+    assert "correspondent_id" not in body and "audio_url" in body